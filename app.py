@@ -4,11 +4,17 @@
 """
 import sys
 import os
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, date
 from typing import Dict, Any, List
 
+import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from loguru import logger
 
 # 添加项目路径
@@ -28,7 +34,10 @@ st.set_page_config(
 
 # ==================== 自定义样式 ====================
 
-st.markdown("""
+@st.cache_data
+def _page_css() -> str:
+    """页面CSS（缓存为静态字符串，避免每次rerun重新构建）"""
+    return """
 <style>
     /* 全局样式 */
     .main {
@@ -132,7 +141,10 @@ st.markdown("""
         border-radius: 5px;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# 单次注入CSS（st.html不经过react-markdown渲染，开销更低）
+st.html(_page_css())
 
 # ==================== 数据配置 ====================
 
@@ -160,6 +172,12 @@ COMPANIES = {
     },
 }
 
+# 只读视图：配置在运行期不应被修改
+COMPANIES = types.MappingProxyType(COMPANIES)
+
+# 下拉框选项（模块级常量，避免每次rerun重建列表）
+COMPANY_OPTIONS = [info["display_name"] for info in COMPANIES.values()]
+
 # 报告期类型
 PERIOD_TYPES = {
     "一季报": "Q1",
@@ -168,17 +186,67 @@ PERIOD_TYPES = {
     "年报": "Q4"
 }
 
+# 各期间对应的报告期截止日（月-日）
+PERIOD_END_DATES = {
+    "Q1": "03-31",
+    "Q2": "06-30",
+    "Q3": "09-30",
+    "Q4": "12-31"
+}
+
+
+@st.cache_data
+def _companies_by_display() -> Dict[str, tuple]:
+    """display_name → (公司名, 公司信息) 的反向索引，避免每次rerun线性扫描"""
+    return {info["display_name"]: (name, info) for name, info in COMPANIES.items()}
+
 # ==================== 辅助函数 ====================
 
+# 后台生成线程池：报告生成耗时30-120秒，放到后台线程避免冻结界面
+@st.cache_resource
+def _get_executor() -> ThreadPoolExecutor:
+    """进程级共享的后台生成线程池
+
+    模块级创建会在每次脚本rerun时重建一个新池并遗弃旧池，
+    cache_resource保证整个进程只建一次（与get_generator同模式）。
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def _run_with_ctx(ctx, fn, *args):
+    """在工作线程中绑定Streamlit脚本上下文后执行fn"""
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return fn(*args)
+
+
+@st.cache_resource(show_spinner="正在初始化财报分析引擎...")
+def get_generator() -> ReportGenerator:
+    """获取进程级共享的报告生成器
+
+    使用st.cache_resource而非session_state：生成器（LangGraph编译、
+    模型句柄、数据库连接）在所有会话间共享，只初始化一次。
+    """
+    return ReportGenerator()
+
+@st.cache_data(persist="disk", show_spinner=False, ttl=60 * 60 * 24 * 7)
+def _cached_generate(company_name: str, company_code: str, report_period: str,
+                     industry: str, report_type: str) -> Dict[str, Any]:
+    """按输入参数缓存报告生成结果（磁盘持久化，7天过期）
+
+    相同的(公司, 报告期, 报表类型)组合直接返回上次的生成结果，
+    避免重复的LLM调用和检索开销。
+    """
+    return get_generator().generate_report(
+        company_name=company_name,
+        company_code=company_code,
+        report_period=report_period,
+        industry=industry,
+        report_type=report_type
+    )
+
 def generate_period_options(year: int, period_type: str) -> str:
     """生成报告期字符串"""
-    period_map = {
-        "Q1": f"{year}-03-31",
-        "Q2": f"{year}-06-30",
-        "Q3": f"{year}-09-30",
-        "Q4": f"{year}-12-31"
-    }
-    return period_map.get(period_type, f"{year}-12-31")
+    return f"{year}-{PERIOD_END_DATES[period_type]}"
 
 def format_processing_time(seconds: float) -> str:
     """格式化处理时间"""
@@ -189,18 +257,29 @@ def format_processing_time(seconds: float) -> str:
         secs = seconds % 60
         return f"{minutes} 分 {secs:.1f} 秒"
 
-def save_report_to_file(report: str, company_name: str, report_period: str) -> Path:
-    """保存报告到文件"""
+def save_report_to_file(report: str, company_name: str, report_period: str) -> tuple:
+    """保存报告到文件
+
+    只做一次UTF-8编码，用os.write直接写入字节，并把同一份字节
+    返回给调用方复用（如下载按钮），避免重复编码整份报告。
+
+    Returns:
+        (文件路径, 报告的UTF-8字节)
+    """
     reports_dir = Path("data/reports")
     reports_dir.mkdir(parents=True, exist_ok=True)
-    
+
     filename = f"{company_name}_{report_period}_财报点评.md"
     filepath = reports_dir / filename
-    
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(report)
-    
-    return filepath
+
+    data = report.encode("utf-8")
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+    return filepath, data
 
 # ==================== 初始化 Session State ====================
 
@@ -208,21 +287,66 @@ if "report_generated" not in st.session_state:
     st.session_state.report_generated = False
 if "report_data" not in st.session_state:
     st.session_state.report_data = None
-if "generator" not in st.session_state:
-    st.session_state.generator = None
 
 # ==================== 主界面 ====================
 
+@st.fragment(run_every=1)
+def _generation_progress():
+    """轮询后台生成任务的进度片段
+
+    每秒自动重跑（仅重绘本片段），完成后写入结果并触发整页rerun，
+    生成期间界面保持可交互。
+    """
+    future = st.session_state.get("future")
+    if future is None:
+        return
+
+    if future.done():
+        st.session_state.future = None
+        try:
+            result = future.result()
+            st.session_state.report_data = result
+            st.session_state.report_generated = True
+            st.session_state.generation_error = None
+            # 落盘只在生成完成时做一次，编码好的字节留给下载按钮
+            # 复用；放在渲染路径会导致每次rerun都重写文件
+            report_content = result.get("report", "")
+            if report_content:
+                _, report_bytes = save_report_to_file(
+                    report_content,
+                    st.session_state.get("generation_company", ""),
+                    st.session_state.get("generation_period", "")
+                )
+                st.session_state.report_bytes = report_bytes
+            else:
+                st.session_state.report_bytes = None
+        except Exception as e:
+            logger.error(f"生成报告失败: {e}")
+            # 片段内的st.error会随紧接着的整页rerun一起消失，
+            # 错误写入session state，由主脚本在rerun后渲染
+            st.session_state.generation_error = str(e)
+            st.session_state.report_generated = False
+        st.rerun()
+    else:
+        elapsed = time.time() - st.session_state.get("generation_started_at", time.time())
+        company = st.session_state.get("generation_company", "")
+        period = st.session_state.get("generation_period", "")
+        st.info(
+            f"📊 正在分析 **{company}** 的 **{period}** 期财报... "
+            f"已用时 {format_processing_time(elapsed)}"
+        )
+
+
 def main():
     """主应用函数"""
     
-    # 标题栏
-    st.markdown("""
+    # 标题栏（静态HTML，不走markdown渲染）
+    st.html("""
     <div class="title-container">
         <h1>📊 财报点评系统</h1>
         <p>基于 LangGraph + DeepSeek 的智能财务分析平台</p>
     </div>
-    """, unsafe_allow_html=True)
+    """)
     
     # ==================== 侧边栏 ====================
     with st.sidebar:
@@ -230,20 +354,14 @@ def main():
         
         # 公司选择
         st.subheader("1️⃣ 选择公司")
-        company_options = [info["display_name"] for info in COMPANIES.values()]
         selected_company_display = st.selectbox(
             "公司名称",
-            options=company_options,
+            options=COMPANY_OPTIONS,
             help="选择要分析的上市公司"
         )
         
-        # 获取选中公司的详细信息
-        selected_company = None
-        for name, info in COMPANIES.items():
-            if info["display_name"] == selected_company_display:
-                selected_company = name
-                company_info = info
-                break
+        # 获取选中公司的详细信息（反向索引，O(1)查找）
+        selected_company, company_info = _companies_by_display()[selected_company_display]
         
         # 显示公司信息
         if selected_company:
@@ -296,54 +414,41 @@ def main():
     
     # ==================== 主内容区 ====================
     
-    # 如果点击生成按钮
+    # 如果点击生成按钮：提交到后台线程，不阻塞脚本线程
     if generate_button:
         st.session_state.report_generated = False
         st.session_state.report_data = None
-        
-        # 显示生成进度
-        with st.spinner(""):
-            progress_container = st.container()
-            with progress_container:
-                st.info("🔄 正在初始化财报分析引擎...")
-                
-                try:
-                    # 初始化生成器
-                    if st.session_state.generator is None:
-                        st.session_state.generator = ReportGenerator()
-                    
-                    generator = st.session_state.generator
-                    
-                    st.info(f"📊 正在分析 **{selected_company}** 的 **{report_period}** 期财报...")
-                    
-                    # 生成报告
-                    result = generator.generate_report(
-                        company_name=selected_company,
-                        company_code=company_info["code"],
-                        report_period=report_period,
-                        industry=company_info["industry"],
-                        report_type=report_type_code
-                    )
-                    
-                    # 保存结果
-                    st.session_state.report_data = result
-                    st.session_state.report_generated = True
-                    
-                    # 清除进度提示
-                    progress_container.empty()
-                    
-                    # 显示成功消息
-                    st.success(f"✅ 财报点评生成成功！耗时: {format_processing_time(result['processing_time'])}")
-                    
-                except Exception as e:
-                    logger.error(f"生成报告失败: {e}")
-                    st.error(f"❌ 生成报告失败: {str(e)}")
-                    st.session_state.report_generated = False
-    
+        st.session_state.report_bytes = None
+        st.session_state.generation_error = None
+
+        st.session_state.future = _get_executor().submit(
+            _run_with_ctx,
+            get_script_run_ctx(),
+            _cached_generate,
+            selected_company,
+            company_info["code"],
+            report_period,
+            company_info["industry"],
+            report_type_code
+        )
+        st.session_state.generation_started_at = time.time()
+        st.session_state.generation_company = selected_company
+        st.session_state.generation_period = report_period
+
+    # 生成进行中：展示轮询进度片段
+    if st.session_state.get("future") is not None:
+        _generation_progress()
+
+    # 生成失败：由进度片段写入session state，在rerun后持续展示
+    elif st.session_state.get("generation_error"):
+        st.error(f"❌ 生成报告失败: {st.session_state.generation_error}")
+
     # 显示报告内容
     if st.session_state.report_generated and st.session_state.report_data:
         result = st.session_state.report_data
-        
+
+        st.success(f"✅ 财报点评生成成功！耗时: {format_processing_time(result['processing_time'])}")
+
         # 报告元数据
         st.divider()
         
@@ -355,14 +460,18 @@ def main():
             core_indicators = indicators.get("core", {})
             
             if core_indicators:
-                cols = st.columns(min(4, len(core_indicators)))
-                
-                for idx, (key, value) in enumerate(core_indicators.items()):
-                    with cols[idx % len(cols)]:
+                items = list(core_indicators.items())
+
+                # 前几项用st.metric卡片突出展示
+                hero_items = items[:4]
+                cols = st.columns(len(hero_items))
+
+                for idx, (key, value) in enumerate(hero_items):
+                    with cols[idx]:
                         name = value.get("name", key)
                         current = value.get("display_format", "N/A")
                         growth = value.get("growth_rate")
-                        
+
                         if growth is not None:
                             st.metric(
                                 label=name,
@@ -371,6 +480,22 @@ def main():
                             )
                         else:
                             st.metric(label=name, value=current)
+
+                # 指标较多时，其余指标合并为一个表格（单条前端消息）
+                rest_items = items[len(hero_items):]
+                if rest_items:
+                    df = pd.DataFrame([
+                        {
+                            "指标": value.get("name", key),
+                            "当期": value.get("display_format", "N/A"),
+                            "同比": (
+                                f"{value['growth_rate']:+.2f}%"
+                                if value.get("growth_rate") is not None else "—"
+                            )
+                        }
+                        for key, value in rest_items
+                    ])
+                    st.dataframe(df, hide_index=True, use_container_width=True)
         
         st.divider()
         
@@ -381,12 +506,12 @@ def main():
             st.subheader("📄 财报点评报告")
         
         with col2:
-            # 下载按钮
-            report_content = result.get("report", "")
-            if report_content:
+            # 下载按钮（复用生成完成时编码好的字节，避免再次编码）
+            report_bytes = st.session_state.get("report_bytes")
+            if report_bytes:
                 st.download_button(
                     label="📥 下载报告",
-                    data=report_content,
+                    data=report_bytes,
                     file_name=f"{selected_company}_{report_period}_财报点评.md",
                     mime="text/markdown",
                     use_container_width=True
@@ -421,19 +546,17 @@ def main():
                     for issue in result["quality_issues"]:
                         st.warning(f"• {issue}")
         
-        # 处理详情
+        # 处理详情（每列合并为一次st.markdown，减少前端消息数）
         with st.expander("🔍 查看处理详情"):
             col1, col2 = st.columns(2)
-            
+
             with col1:
-                st.markdown("**处理步骤:**")
-                for step in result.get("processing_steps", []):
-                    st.text(f"✓ {step}")
-            
+                steps = result.get("processing_steps", [])
+                st.markdown("**处理步骤:**\n\n" + "\n".join(f"- ✓ {s}" for s in steps))
+
             with col2:
-                st.markdown("**调用的工具:**")
-                for tool in result.get("tools_called", []):
-                    st.text(f"🔧 {tool}")
+                tools = result.get("tools_called", [])
+                st.markdown("**调用的工具:**\n\n" + "\n".join(f"- 🔧 {t}" for t in tools))
     
     else:
         # 欢迎界面
@@ -455,35 +578,17 @@ def main():
         - 📝 生成专业的 Markdown 格式报告
         """)
         
-        # 显示示例
+        # 显示示例（单次st.markdown渲染三列，减少前端消息数）
         st.divider()
         st.subheader("📚 功能预览")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("""
-            **🎯 核心指标分析**
-            - 营业收入增速
-            - 净利润增速
-            - 归母净利润变化
-            """)
-        
-        with col2:
-            st.markdown("""
-            **📊 辅助指标分析**
-            - 毛利率分析
-            - 研发费用率
-            - 销售费用率
-            """)
-        
-        with col3:
-            st.markdown("""
-            **🔍 个性化指标**
-            - 合同负债变化
-            - 存货环比变化
-            - 行业特定指标
-            """)
+
+        st.markdown("""
+| 🎯 核心指标分析 | 📊 辅助指标分析 | 🔍 个性化指标 |
+| --- | --- | --- |
+| 营业收入增速 | 毛利率分析 | 合同负债变化 |
+| 净利润增速 | 研发费用率 | 存货环比变化 |
+| 归母净利润变化 | 销售费用率 | 行业特定指标 |
+        """)
     
     # 页脚
     st.divider()
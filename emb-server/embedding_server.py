@@ -16,18 +16,33 @@ uvicorn embedding_server:app --host 0.0.0.0 --port 8080 --reload
 --model: 模型名称或路径 (默认: BAAI/bge-base-zh-v1.5)
 --device: 运行设备 cuda/cpu (默认: cuda if available)
 --cache-dir: 模型缓存目录 (可选，指定后会将模型下载到该目录)
+--backend: 推理后端 torch/onnx (默认: torch；onnx需指定导出的ONNX模型目录)
 --workers: 工作进程数 (默认: 1)
+
+注意：本服务不建议设置 --workers > 1。每个worker进程都会独立加载一份
+模型权重（约400MB显存/内存），且无法共享微批处理队列和向量缓存。
+并发能力由异步微批处理提供（GPU是瓶颈而非Python），CPU部署则通过
+torch线程并行（自动设置torch.set_num_threads）。
 --reload: 开启热重载，用于开发模式
 """
 
 import argparse
+import asyncio
+import base64
+import hashlib
+import json
 import os
-from typing import List, Optional
+import time
+from collections import OrderedDict
+from typing import List, Literal, Optional, Tuple, Union
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import numpy as np
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from sentence_transformers import SentenceTransformer
 import torch
 from loguru import logger
@@ -38,6 +53,14 @@ DEFAULT_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 DEFAULT_BATCH_SIZE = 32
 DEFAULT_CACHE_DIR = None  # 默认使用系统缓存目录
 
+# 微批处理配置：短时间窗口内合并多个并发请求，一次前向计算
+BATCH_WINDOW_SECONDS = 0.005  # 合并等待窗口
+MAX_COALESCED_TEXTS = 256     # 单次合并的最大文本数
+
+# 请求限额：超大请求会长时间独占GPU，拖垮其他并发请求的尾延迟
+MAX_TEXTS_PER_REQUEST = 2048       # 单次请求最大文本数
+MAX_TOTAL_CHARS_PER_REQUEST = 4_000_000  # 单次请求最大总字符数
+
 # ==================== API模型 ====================
 
 class EmbeddingRequest(BaseModel):
@@ -45,10 +68,32 @@ class EmbeddingRequest(BaseModel):
     texts: List[str] = Field(..., description="文本列表", min_items=1)
     model: Optional[str] = Field(default=DEFAULT_MODEL, description="模型名称")
     batch_size: Optional[int] = Field(default=DEFAULT_BATCH_SIZE, description="批处理大小")
+    encoding: Literal["float32_list", "float16_b64"] = Field(
+        default="float32_list",
+        description="向量编码格式：float32_list为JSON浮点列表；float16_b64为float16小端字节的base64字符串，体积约为前者的1/6"
+    )
+
+    @field_validator("texts")
+    @classmethod
+    def _check_size_limits(cls, v: List[str]) -> List[str]:
+        """限制请求规模，防止超大批次长时间独占GPU导致OOM或饿死并发请求"""
+        if len(v) > MAX_TEXTS_PER_REQUEST:
+            raise ValueError(
+                f"文本数量超过限制: {len(v)} > {MAX_TEXTS_PER_REQUEST}"
+            )
+        total_chars = sum(len(t) for t in v)
+        if total_chars > MAX_TOTAL_CHARS_PER_REQUEST:
+            raise ValueError(
+                f"总字符数超过限制: {total_chars} > {MAX_TOTAL_CHARS_PER_REQUEST}"
+            )
+        return v
 
 class EmbeddingResponse(BaseModel):
     """Embedding响应"""
-    embeddings: List[List[float]] = Field(..., description="向量列表")
+    embeddings: Union[List[List[float]], List[str]] = Field(
+        ..., description="向量列表（浮点列表或base64字符串，由请求的encoding决定）"
+    )
+    encoding: str = Field(default="float32_list", description="向量编码格式")
     model: str = Field(..., description="模型名称")
     dimension: int = Field(..., description="向量维度")
     count: int = Field(..., description="向量数量")
@@ -66,23 +111,35 @@ class HealthResponse(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
+    global request_queue, batch_worker_task
     # Startup: 初始化模型
     logger.info("🚀 Embedding服务启动中...")
     if embedding_model is None:
         logger.info("检测到通过uvicorn直接启动，使用默认配置初始化模型")
         # 使用默认模型和设备，不指定cache_dir（使用系统默认）
         init_model(DEFAULT_MODEL, DEFAULT_DEVICE, cache_folder=None)
+    # 启动微批处理后台任务
+    request_queue = asyncio.Queue()
+    batch_worker_task = asyncio.create_task(batch_worker())
+    logger.info("✅ 微批处理队列已启动")
     yield
-    # Shutdown: 清理资源（如果需要）
+    # Shutdown: 清理资源
     logger.info("🛑 Embedding服务关闭中...")
+    if batch_worker_task is not None:
+        batch_worker_task.cancel()
 
 app = FastAPI(
     title="Embedding Service",
     description="提供文本向量化服务",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# 响应压缩：embedding响应（JSON浮点列表或base64）压缩比很高，
+# 跨主机部署时显著降低带宽占用
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # 全局变量
 embedding_model: Optional[SentenceTransformer] = None
 model_name: str = DEFAULT_MODEL
@@ -90,11 +147,183 @@ device: str = DEFAULT_DEVICE
 dimension: int = 1024  # bge-base-zh-v1.5 的维度
 cache_dir: Optional[str] = None
 
+# 微批处理队列：元素为 (texts, batch_size, future)
+request_queue: Optional[asyncio.Queue] = None
+batch_worker_task: Optional[asyncio.Task] = None
+
+# 跨请求的向量LRU缓存：key为文本md5，value为float16向量（约2KB/条）
+EMBEDDING_CACHE_MAX = 100_000
+embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+
+def _cache_key(text: str) -> str:
+    """计算文本的缓存key"""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def _cache_put(key: str, vector: np.ndarray):
+    """写入LRU缓存，超出容量时淘汰最久未使用的条目"""
+    embedding_cache[key] = vector.astype(np.float16, copy=False)
+    embedding_cache.move_to_end(key)
+    while len(embedding_cache) > EMBEDDING_CACHE_MAX:
+        embedding_cache.popitem(last=False)
+
+
+def encode_with_cache(texts: List[str], batch_size: int) -> np.ndarray:
+    """去重 + 缓存后再调用模型encode
+
+    RAG入库场景中重复文本（表格单元、页眉页脚等）很常见，
+    先在批内去重，再查跨请求LRU缓存，只对未命中的文本做前向计算。
+    """
+    keys = [_cache_key(t) for t in texts]
+
+    # 批内去重，并收集缓存未命中的文本
+    miss_texts: List[str] = []
+    miss_keys: List[str] = []
+    seen = set()
+    for text, key in zip(texts, keys):
+        if key in seen or key in embedding_cache:
+            if key in embedding_cache:
+                embedding_cache.move_to_end(key)
+            continue
+        seen.add(key)
+        miss_texts.append(text)
+        miss_keys.append(key)
+
+    if miss_texts:
+        # 按长度排序后再编码：同一batch内文本长度接近，
+        # 避免短文本被padding到batch内最长文本的长度而浪费算力
+        order = np.argsort([len(t) for t in miss_texts])
+        sorted_embeddings = embedding_model.encode(
+            [miss_texts[i] for i in order],
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        # 还原为原始顺序
+        miss_embeddings = sorted_embeddings[np.argsort(order)]
+        for key, vector in zip(miss_keys, miss_embeddings):
+            _cache_put(key, vector)
+        if len(miss_texts) < len(texts):
+            logger.info(f"批内去重/缓存命中: {len(texts) - len(miss_texts)}/{len(texts)}")
+
+    return np.stack([embedding_cache[key] for key in keys]).astype(np.float32)
+
+
+async def batch_worker():
+    """后台微批处理任务
+
+    从队列中取出并发请求，在短时间窗口内合并为一个大批次，
+    将阻塞的encode调用放到线程中执行，避免卡住事件循环，
+    再按偏移量把结果拆分回各自的请求。
+    """
+    while True:
+        items: List[Tuple[List[str], int, asyncio.Future]] = [await request_queue.get()]
+
+        # 在时间窗口内尽量多收集请求，合并为一个批次
+        total_texts = len(items[0][0])
+        while total_texts < MAX_COALESCED_TEXTS:
+            try:
+                item = await asyncio.wait_for(
+                    request_queue.get(), timeout=BATCH_WINDOW_SECONDS
+                )
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            total_texts += len(item[0])
+
+        all_texts = [t for texts, _, _ in items for t in texts]
+        batch_size = max(bs for _, bs, _ in items)
+
+        try:
+            # encode是CPU/GPU密集的阻塞调用，放入线程执行
+            embeddings = await asyncio.to_thread(
+                encode_with_cache, all_texts, batch_size
+            )
+
+            # 按偏移量拆分结果，回填各请求的future
+            offset = 0
+            for texts, _, fut in items:
+                if not fut.done():
+                    fut.set_result(embeddings[offset:offset + len(texts)])
+                offset += len(texts)
+        except Exception as e:
+            for _, _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+
+
+class OnnxEncoder:
+    """ONNX Runtime推理后端
+
+    加载导出的ONNX模型（如 optimum-cli export onnx 的产物），
+    提供与SentenceTransformer.encode兼容的接口。
+    相比PyTorch后端，小批量请求的延迟更低（省去逐op的Python调度），
+    且尾延迟更可预测。
+
+    模型目录需包含 model.onnx 及tokenizer文件，导出方式：
+    optimum-cli export onnx --model BAAI/bge-base-zh-v1.5 --optimize O4 <dir>
+    """
+
+    def __init__(self, model_dir: str, device_name: str):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        if device_name.startswith("cuda"):
+            providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+        else:
+            providers = ["CPUExecutionProvider"]
+
+        onnx_path = str(Path(model_dir) / "model.onnx")
+        self.session = ort.InferenceSession(onnx_path, providers=providers)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"ONNX providers: {self.session.get_providers()}")
+
+    def encode(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+               show_progress_bar: bool = False, convert_to_numpy: bool = True) -> np.ndarray:
+        """分批tokenize并推理，CLS池化后做L2归一化（与bge系列模型一致）"""
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            feeds = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=512,
+                return_tensors="np"
+            )
+            feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            cls = hidden[:, 0]
+            norms = np.linalg.norm(cls, axis=1, keepdims=True)
+            outputs.append(cls / np.clip(norms, 1e-12, None))
+        return np.concatenate(outputs, axis=0)
+
 
-def init_model(model_path: str, device_name: str, cache_folder: Optional[str] = None):
-    """初始化embedding模型"""
+def init_model(model_path: str, device_name: str, cache_folder: Optional[str] = None,
+               backend: str = "torch"):
+    """初始化embedding模型
+
+    backend: torch使用SentenceTransformer；onnx使用OnnxEncoder
+             （model_path需指向已导出的ONNX模型目录）
+    """
     global embedding_model, model_name, device, dimension, cache_dir
-    
+
+    # CPU部署时用满所有核心做算子内并行（单进程多线程，权重只加载一份）
+    if not device_name.startswith("cuda"):
+        torch.set_num_threads(os.cpu_count() or 1)
+
+    if backend == "onnx":
+        logger.info(f"正在加载ONNX模型: {model_path}")
+        embedding_model = OnnxEncoder(model_path, device_name)
+        model_name = model_path
+        device = device_name
+        cache_dir = cache_folder
+        dimension = embedding_model.encode(["测试"]).shape[1]
+        logger.success(f"✅ ONNX模型加载完成: {model_name} (维度: {dimension})")
+        return
+
     try:
         logger.info(f"正在加载Embedding模型: {model_path}")
         logger.info(f"设备: {device_name}")
@@ -118,33 +347,72 @@ def init_model(model_path: str, device_name: str, cache_folder: Optional[str] =
             # HuggingFace模型名：使用cache_folder
             logger.info(f"🌐 从HuggingFace加载: {model_path}")
             
-            # 设置缓存目录
+            # 注意：SENTENCE_TRANSFORMERS_HOME/TRANSFORMERS_CACHE在HF导入时
+            # 就已被读取，运行到这里再写环境变量会被静默忽略。
+            # 改用snapshot_download显式指定下载目录，下载是幂等的，
+            # 进程重启不会重复拉取。
+            from huggingface_hub import snapshot_download
+
             if cache_folder:
                 cache_path = Path(cache_folder)
                 cache_path.mkdir(parents=True, exist_ok=True)
-                os.environ['SENTENCE_TRANSFORMERS_HOME'] = str(cache_path)
-                os.environ['TRANSFORMERS_CACHE'] = str(cache_path)
                 cache_dir = str(cache_path)
                 logger.info(f"📁 模型缓存目录: {cache_dir}")
-            
-            # 设置HuggingFace镜像
-            if 'HF_ENDPOINT' not in os.environ:
-                os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
-                logger.info("🌐 已设置HuggingFace镜像: https://hf-mirror.com")
-            
+
+            endpoint = os.environ.get('HF_ENDPOINT', 'https://hf-mirror.com')
+            logger.info(f"🌐 HuggingFace端点: {endpoint}")
+
+            local_model_dir = snapshot_download(
+                repo_id=model_path,
+                cache_dir=cache_folder,
+                endpoint=endpoint
+            )
+
             embedding_model = SentenceTransformer(
-                model_path, 
-                device=device_name,
-                cache_folder=cache_folder
+                local_model_dir,
+                device=device_name
             )
             model_name = model_path
         
         device = device_name
-        
+
+        # CUDA设备上启用FP16 + torch.compile加速推理
+        if device_name.startswith("cuda"):
+            try:
+                # FP16：利用Tensor Core，吞吐约提升2倍；embedding推理精度损失可忽略
+                embedding_model = embedding_model.half()
+                logger.info("⚡ 已启用FP16推理")
+            except Exception as e:
+                logger.warning(f"启用FP16失败，继续使用FP32: {e}")
+            try:
+                # torch.compile融合encoder计算图，消除逐op的Python调度开销
+                embedding_model[0].auto_model = torch.compile(
+                    embedding_model[0].auto_model,
+                    mode="reduce-overhead",
+                    fullgraph=False
+                )
+                logger.info("⚡ 已启用torch.compile (reduce-overhead)")
+            except Exception as e:
+                logger.warning(f"torch.compile不可用，使用eager模式: {e}")
+
         # 获取向量维度
         test_embedding = embedding_model.encode(["测试"], convert_to_numpy=True)
         dimension = test_embedding.shape[1]
-        
+
+        # 预热：触发tokenizer加载、cuDNN自动调优和torch.compile特化，
+        # 避免首个真实请求承担200ms-2s的一次性开销
+        for warmup_bs in (1, 8, DEFAULT_BATCH_SIZE):
+            start = time.perf_counter()
+            embedding_model.encode(
+                ["财报点评"] * warmup_bs,
+                batch_size=warmup_bs,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            logger.info(f"预热 batch_size={warmup_bs}: {time.perf_counter() - start:.2f}s")
+        if device_name.startswith("cuda"):
+            torch.cuda.synchronize()
+
         logger.success(f"✅ 模型加载完成: {model_name}")
         logger.success(f"✅ 向量维度: {dimension}")
         logger.success(f"✅ 运行设备: {device}")
@@ -169,7 +437,7 @@ async def health_check():
     )
 
 
-@app.post("/embeddings", response_model=EmbeddingResponse)
+@app.post("/embeddings")
 async def generate_embeddings(request: EmbeddingRequest):
     """生成文本embeddings"""
     if embedding_model is None:
@@ -182,31 +450,82 @@ async def generate_embeddings(request: EmbeddingRequest):
         if not request.texts:
             raise HTTPException(status_code=400, detail="文本列表不能为空")
         
-        # 生成embeddings
-        embeddings = embedding_model.encode(
-            request.texts,
-            batch_size=request.batch_size or DEFAULT_BATCH_SIZE,
-            show_progress_bar=True,
-            convert_to_numpy=True
+        # 通过微批处理队列生成embeddings（多个并发请求会合并为一次前向计算）
+        embeddings = await _enqueue_encode(
+            request.texts, request.batch_size or DEFAULT_BATCH_SIZE
         )
         
-        # 转换为列表
-        embeddings_list = embeddings.tolist()
-        
-        logger.success(f"✅ 生成了{len(embeddings_list)}个embeddings")
-        
-        return EmbeddingResponse(
-            embeddings=embeddings_list,
-            model=model_name,
-            dimension=dimension,
-            count=len(embeddings_list)
-        )
+        # 按请求的编码格式序列化向量
+        if request.encoding == "float16_b64":
+            # float16小端字节 + base64：体积约为JSON浮点列表的1/6
+            arr = embeddings.astype(np.float16, copy=False)
+            payload = [base64.b64encode(v.tobytes()).decode("ascii") for v in arr]
+        else:
+            payload = embeddings.tolist()
+
+        logger.success(f"✅ 生成了{len(payload)}个embeddings")
+
+        # 直接返回dict并交给orjson序列化：避免pydantic对
+        # List[List[float]]逐元素校验（1000×1024的批次≈百万次isinstance）
+        return ORJSONResponse({
+            "embeddings": payload,
+            "encoding": request.encoding,
+            "model": model_name,
+            "dimension": dimension,
+            "count": len(payload)
+        })
         
     except Exception as e:
         logger.error(f"❌ 生成embeddings失败: {e}")
         raise HTTPException(status_code=500, detail=f"生成embeddings失败: {str(e)}")
 
 
+async def _enqueue_encode(texts: List[str], batch_size: int) -> np.ndarray:
+    """把一批文本交给微批处理队列编码，返回numpy向量"""
+    if request_queue is not None:
+        future = asyncio.get_running_loop().create_future()
+        await request_queue.put((texts, batch_size, future))
+        return await future
+    return await asyncio.to_thread(encode_with_cache, texts, batch_size)
+
+
+@app.websocket("/embeddings/ws")
+async def embeddings_websocket(websocket: WebSocket):
+    """WebSocket embedding接口
+
+    面向入库等高频批量调用场景：省去每次请求的HTTP握手和JSON浮点
+    序列化。协议：客户端发送JSON文本帧 {"texts": [...]}；服务端先回
+    一个JSON元数据帧 {"count", "dimension", "dtype"}，再回一个二进制帧，
+    内容为 count×dimension 个float16小端字节。
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                # 经EmbeddingRequest校验：与HTTP接口共用同一套
+                # 文本数/总字符数限额，超大帧在进编码队列前即被
+                # 拒绝（否则单帧可绕过OOM防护打爆GPU和向量缓存）
+                request = EmbeddingRequest.model_validate(json.loads(message))
+            except (ValidationError, ValueError, json.JSONDecodeError) as e:
+                await websocket.send_text(json.dumps({"error": str(e)}))
+                continue
+
+            embeddings = await _enqueue_encode(
+                request.texts, request.batch_size or DEFAULT_BATCH_SIZE
+            )
+            arr = np.ascontiguousarray(embeddings.astype(np.float16, copy=False))
+
+            await websocket.send_text(json.dumps({
+                "count": int(arr.shape[0]),
+                "dimension": int(arr.shape[1]),
+                "dtype": "float16"
+            }))
+            await websocket.send_bytes(arr.tobytes())
+    except WebSocketDisconnect:
+        pass
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -220,6 +539,7 @@ async def root():
         "endpoints": {
             "health": "/health",
             "embeddings": "/embeddings",
+            "embeddings_ws": "/embeddings/ws",
             "docs": "/docs"
         }
     }
@@ -235,13 +555,23 @@ def main():
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help="模型名称或路径")
     parser.add_argument("--device", type=str, default=DEFAULT_DEVICE, help="运行设备 (cuda/cpu)")
     parser.add_argument("--cache-dir", type=str, default=None, help="模型缓存目录")
+    parser.add_argument("--backend", type=str, default="torch", choices=["torch", "onnx"],
+                        help="推理后端：torch (SentenceTransformer) 或 onnx (需指定导出的ONNX模型目录)")
     parser.add_argument("--workers", type=int, default=1, help="工作进程数")
     parser.add_argument("--reload", action="store_true", help="开启热重载（开发模式）")
     
     args = parser.parse_args()
-    
+
+    if args.workers > 1:
+        # 多worker会各自加载一份模型权重，且各自维护独立的批处理队列和缓存；
+        # 并发应依赖异步微批处理（GPU）或torch线程并行（CPU）
+        logger.warning(
+            f"⚠️ --workers={args.workers}: 每个worker进程都会独立加载模型权重，"
+            f"显存/内存占用成倍增加，建议保持 --workers 1"
+        )
+
     # 初始化模型
-    init_model(args.model, args.device, args.cache_dir)
+    init_model(args.model, args.device, args.cache_dir, backend=args.backend)
     
     # 启动服务
     import uvicorn
@@ -13,10 +13,11 @@
 - 对于超长段落，使用字符分块
 """
 
-import re
-from typing import List, Dict, Optional, Literal
+import itertools
+from typing import Iterator, List, Dict, Optional, Literal, Tuple
 from dataclasses import dataclass
-from pathlib import Path
+
+import numpy as np
 from loguru import logger
 
 try:
@@ -29,16 +30,101 @@ except ImportError:
     DOCLING_AVAILABLE = False
     logger.warning("docling 不可用，将使用基础分块策略")
 
+try:
+    # Rust实现的分块器（可选依赖）：原生代码完成句子合并和重叠，
+    # 比纯Python的合并循环快1-2个数量级
+    from semantic_text_splitter import TextSplitter
+    TEXT_SPLITTER_AVAILABLE = True
+except ImportError:
+    TEXT_SPLITTER_AVAILABLE = False
+
+
+# 分隔符码点表（numpy向量化扫描用）：句子分隔符：。！？；和换行；段落分隔符：换行
+_SENTENCE_DELIM_CODES = np.frombuffer("。！？；\n".encode('utf-32-le'), dtype=np.uint32)
+_PARAGRAPH_DELIM_CODES = np.frombuffer("\r\n".encode('utf-32-le'), dtype=np.uint32)
+# Markdown特征子串：行首的标题/列表标记或代码块围栏。
+# 用str.__contains__（底层memmem，SIMD加速）做单遍扫描，
+# 比多行正则逐行回溯便宜得多
+_MD_LINE_MARKERS = tuple(
+    f"\n{prefix} " for prefix in ("#", "##", "###", "####", "#####", "######", "*", "-")
+) + ("```",)
+_MD_START_MARKERS = ("# ", "## ", "### ", "#### ", "##### ", "###### ", "* ", "- ")
+
+
+def _is_markdown(text: str) -> bool:
+    """快速检测文本是否为Markdown格式"""
+    return text.startswith(_MD_START_MARKERS) or any(m in text for m in _MD_LINE_MARKERS)
+
 
 @dataclass
+class PreparedText:
+    """单次扫描得到的文本结构信息，在各分块策略间共享
+
+    sentence_breaks/paragraph_breaks是分隔符在text中的码点位置数组。
+    各策略基于这些整数索引切分，避免每个策略各自再对全文做一遍扫描。
+    """
+    text: str
+    sentence_breaks: np.ndarray
+    paragraph_breaks: np.ndarray
+    is_markdown: bool
+
+
+def _prepare_text(text: str) -> PreparedText:
+    """构建PreparedText：在utf-32视图上用numpy一次定位所有边界
+
+    utf-32-le编码下每个码点固定4字节，数组下标与str下标一一对应，
+    np.isin在一次向量化遍历中同时得到句子和段落边界。
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return PreparedText(
+        text=text,
+        sentence_breaks=np.where(np.isin(codes, _SENTENCE_DELIM_CODES))[0],
+        paragraph_breaks=np.where(np.isin(codes, _PARAGRAPH_DELIM_CODES))[0],
+        is_markdown=_is_markdown(text),
+    )
+
+
+def _iter_segments(text: str, breaks: np.ndarray) -> Iterator[Tuple[str, int, int]]:
+    """按预计算的分隔符位置产出(片段, 起点, 终点)
+
+    片段已strip且非空，起止偏移对应strip后的内容在原文中的位置。
+    """
+    prev = 0
+    # chain避免为追加末尾哨兵而复制整个边界列表
+    for b in itertools.chain(breaks.tolist(), (len(text),)):
+        if b > prev:
+            piece = text[prev:b]
+            stripped = piece.strip()
+            if stripped:
+                start = prev + (len(piece) - len(piece.lstrip()))
+                yield stripped, start, start + len(stripped)
+        prev = b + 1
+
+
+# 模块级共享的DocumentConverter（构造较重，按需初始化一次）
+_document_converter = None
+
+
+def _get_document_converter():
+    """获取共享的docling DocumentConverter实例"""
+    global _document_converter
+    if _document_converter is None:
+        _document_converter = DocumentConverter()
+    return _document_converter
+
+
+@dataclass(frozen=True, slots=True)
 class ChunkConfig:
-    """分块配置"""
+    """分块配置
+
+    frozen使配置可哈希（可直接作为lru_cache的key），slots省去
+    每实例的__dict__。min_chunk_size/preserve_boundaries从未被
+    任何策略消费，已移除。
+    """
     chunk_size: int = 500  # 每块字符数
     overlap: int = 50  # 重叠字符数
     strategy: Literal["character", "sentence", "paragraph", "hierarchical", "hybrid"] = "hybrid"
-    min_chunk_size: int = 50  # 最小块大小
     max_chunk_size: int = 2000  # 最大块大小
-    preserve_boundaries: bool = True  # 是否保留边界（段落、句子）
 
 
 class HybridChunker:
@@ -60,7 +146,20 @@ class HybridChunker:
         """
         self.config = config or ChunkConfig()
         self.hierarchical_chunker = None
-        
+        self.text_splitter = None
+
+        if TEXT_SPLITTER_AVAILABLE and self.config.strategy in ["sentence", "paragraph", "hybrid"]:
+            try:
+                self.text_splitter = TextSplitter(
+                    capacity=self.config.chunk_size,
+                    overlap=self.config.overlap
+                )
+                logger.info("✅ 已启用Rust分块器 (semantic_text_splitter)")
+            except Exception as e:
+                logger.warning(f"⚠️ semantic_text_splitter 初始化失败: {e}，使用Python实现")
+                self.text_splitter = None
+
+
         if DOCLING_AVAILABLE and self.config.strategy in ["hierarchical", "hybrid"]:
             try:
                 self.hierarchical_chunker = HierarchicalChunker()
@@ -84,33 +183,38 @@ class HybridChunker:
             - end_char: 结束字符位置
             - metadata: 元数据
         """
+        result = list(self.chunk_iter(text, metadata))
+        logger.info(f"✅ 文本分块完成: {len(result)}个chunks (策略: {self.config.strategy})")
+        return result
+
+    def chunk_iter(self, text: str, metadata: Optional[Dict] = None) -> Iterator[Dict]:
+        """分块文本（生成器版本）
+
+        逐个产出chunk dict（字段同chunk()），不在内存中累积完整
+        结果列表，供流式响应等增量消费场景使用。
+        """
         if not text or not text.strip():
-            return []
+            return
         
         metadata = metadata or {}
         
-        # 根据策略选择分块方法
+        # 根据策略选择分块方法；除character外都先做一次共享的边界扫描
         if self.config.strategy == "character":
             chunks = self._chunk_by_character(text)
         elif self.config.strategy == "sentence":
-            chunks = self._chunk_by_sentence(text)
+            chunks = self._chunk_by_sentence(_prepare_text(text))
         elif self.config.strategy == "paragraph":
-            chunks = self._chunk_by_paragraph(text)
+            chunks = self._chunk_by_paragraph(_prepare_text(text))
         elif self.config.strategy == "hierarchical":
-            chunks = self._chunk_hierarchical(text)
+            chunks = self._chunk_hierarchical(_prepare_text(text))
         elif self.config.strategy == "hybrid":
-            chunks = self._chunk_hybrid(text)
+            chunks = self._chunk_hybrid(_prepare_text(text))
         else:
             raise ValueError(f"未知的分块策略: {self.config.strategy}")
         
-        # 添加元数据和索引
-        result = []
-        for idx, chunk_text in enumerate(chunks):
-            # 计算字符位置
-            start_char = text.find(chunk_text)
-            end_char = start_char + len(chunk_text) if start_char >= 0 else len(chunk_text)
-            
-            result.append({
+        # 添加元数据和索引（偏移量由各分块方法直接给出，无需回查原文）
+        for idx, (chunk_text, start_char, end_char) in enumerate(chunks):
+            yield {
                 "text": chunk_text.strip(),
                 "index": idx,
                 "start_char": start_char,
@@ -120,160 +224,236 @@ class HybridChunker:
                     "chunk_size": len(chunk_text),
                     "strategy": self.config.strategy
                 }
-            })
-        
-        logger.info(f"✅ 文本分块完成: {len(result)}个chunks (策略: {self.config.strategy})")
-        return result
+            }
     
-    def _chunk_by_character(self, text: str) -> List[str]:
-        """基于字符数分块（带重叠）"""
-        chunks = []
+    def _chunk_by_character(self, text: str, base: int = 0) -> List[Tuple[str, int, int]]:
+        """基于字符数分块（带重叠）
+
+        Args:
+            text: 待分块文本
+            base: text在原始文档中的起始偏移（当text是子串时传入）
+
+        Returns:
+            (chunk文本, 起始偏移, 结束偏移) 列表
+        """
         chunk_size = self.config.chunk_size
-        overlap = self.config.overlap
-        step = chunk_size - overlap
-        
-        for i in range(0, len(text), step):
-            chunk = text[i:i + chunk_size]
-            if chunk.strip():  # 跳过空chunk
-                chunks.append(chunk)
-        
-        return chunks
-    
-    def _chunk_by_sentence(self, text: str) -> List[str]:
+        step = chunk_size - self.config.overlap
+        n = len(text)
+        # 列表推导一次构建结果：省去逐次append的方法查找；
+        # isspace()只读不拷贝，比strip()truthiness检查更省
+        return [
+            (chunk, base + i, base + min(i + chunk_size, n))
+            for i in range(0, n, step)
+            if not (chunk := text[i:i + chunk_size]).isspace()
+        ]
+
+    def _chunk_by_sentence(self, prepared: PreparedText) -> List[Tuple[str, int, int]]:
         """基于句子分块
-        
-        先按句子分割，然后合并到合适的chunk_size
+
+        基于PreparedText中预计算的句子边界合并到合适的chunk_size。
+        迭代时跟踪每个句子在原文中的span，合并chunk的偏移为
+        （首个句子的起点，最后一个句子的终点）。
         """
-        # 中文句子分隔符
-        sentence_pattern = r'[。！？；\n]+'
-        sentences = re.split(sentence_pattern, text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
+        if self.text_splitter is not None:
+            return self._chunk_with_text_splitter(prepared.text)
+
         chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
+        # 用列表累积句子、flush时一次join：
+        # 逐句的str拼接是O(C·k)的重复拷贝，列表+join是O(C)
+        current_pieces: List[str] = []
+        current_starts: List[int] = []  # 各句在原文中的起点，与current_pieces对齐
+        current_len = 0  # join后的长度（含分隔空格）
+        current_start = 0
+        current_end = 0
+
+        for sentence, sent_start, sent_end in _iter_segments(
+                prepared.text, prepared.sentence_breaks):
             # 如果单个句子超过max_chunk_size，使用字符分块
             if len(sentence) > self.config.max_chunk_size:
                 # 先保存当前chunk
-                if current_chunk:
-                    chunks.append(current_chunk)
+                if current_pieces:
+                    chunks.append((" ".join(current_pieces), current_start, current_end))
                 # 对长句子进行字符分块
-                char_chunks = self._chunk_by_character(sentence)
-                chunks.extend(char_chunks)
-                current_chunk = ""
+                chunks.extend(self._chunk_by_character(sentence, base=sent_start))
+                current_pieces = []
+                current_starts = []
+                current_len = 0
                 continue
-            
+
             # 如果添加这个句子会超过chunk_size
-            if current_chunk and len(current_chunk) + len(sentence) + 1 > self.config.chunk_size:
-                chunks.append(current_chunk)
-                # 保留重叠部分
-                if self.config.overlap > 0 and len(current_chunk) > self.config.overlap:
-                    current_chunk = current_chunk[-self.config.overlap:] + sentence
+            if current_pieces and current_len + len(sentence) + 1 > self.config.chunk_size:
+                chunks.append((" ".join(current_pieces), current_start, current_end))
+                # 句界对齐的重叠：从尾部保留完整句子直到累计长度达到overlap，
+                # 不再对chunk做字符切片——重叠内容总是完整句子（中文里
+                # 字符切片会把"第三季度"这类词切半），且偏移对应原文位置
+                if self.config.overlap > 0:
+                    keep = self._overlap_carry_index(current_pieces)
+                    current_pieces = current_pieces[keep:]
+                    current_starts = current_starts[keep:]
                 else:
-                    current_chunk = sentence
+                    current_pieces = []
+                    current_starts = []
+                current_pieces.append(sentence)
+                current_starts.append(sent_start)
+                current_len = sum(map(len, current_pieces)) + len(current_pieces) - 1
+                current_start = current_starts[0]
+                current_end = sent_end
             else:
-                current_chunk += (" " if current_chunk else "") + sentence
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-        
+                if not current_pieces:
+                    current_start = sent_start
+                    current_len = len(sentence)
+                else:
+                    current_len += len(sentence) + 1
+                current_pieces.append(sentence)
+                current_starts.append(sent_start)
+                current_end = sent_end
+
+        if current_pieces:
+            chunks.append((" ".join(current_pieces), current_start, current_end))
+
         return chunks
-    
-    def _chunk_by_paragraph(self, text: str) -> List[str]:
+
+    def _overlap_carry_index(self, pieces: List[str]) -> int:
+        """计算边界对齐重叠的保留起点
+
+        从尾部向前累积完整片段（句子或段落），直到累计长度达到
+        config.overlap；至少丢弃最早的一个片段，保证窗口前移。
+        """
+        carried = 0
+        idx = len(pieces)
+        while idx > 1 and carried < self.config.overlap:
+            idx -= 1
+            carried += len(pieces[idx]) + 1
+        return idx
+
+    def _chunk_with_text_splitter(self, text: str) -> List[Tuple[str, int, int]]:
+        """用Rust分块器做语义感知的分块（带原文偏移）"""
+        return [
+            (chunk, offset, offset + len(chunk))
+            for offset, chunk in self.text_splitter.chunk_indices(text)
+        ]
+
+    def _chunk_by_paragraph(self, prepared: PreparedText) -> List[Tuple[str, int, int]]:
         """基于段落分块（类似 report_ingestion_service 中的实现）"""
+        if self.text_splitter is not None:
+            return self._chunk_with_text_splitter(prepared.text)
+
         chunks = []
-        
-        # 按段落分割（中文段落通常用换行分隔）
-        paragraphs = text.replace('\r\n', '\n').split('\n')
-        
-        current_chunk = ""
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-            
+        # 与_chunk_by_sentence相同：列表累积 + flush时一次join
+        current_pieces: List[str] = []
+        current_starts: List[int] = []  # 各段在原文中的起点，与current_pieces对齐
+        current_len = 0  # join后的长度（含换行分隔符）
+        current_start = 0
+        current_end = 0
+
+        # 按段落分割（中文段落通常用换行分隔），边界来自共享的预扫描
+        for paragraph, para_start, para_end in _iter_segments(
+                prepared.text, prepared.paragraph_breaks):
             # 如果当前段落加入后超过chunk_size
-            if len(current_chunk) + len(paragraph) > self.config.chunk_size:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                    # 保留重叠部分
-                    if self.config.overlap > 0 and len(current_chunk) > self.config.overlap:
-                        current_chunk = current_chunk[-self.config.overlap:] + "\n" + paragraph
+            if current_len + len(paragraph) > self.config.chunk_size:
+                if current_pieces:
+                    chunks.append(("\n".join(current_pieces), current_start, current_end))
+                    # 段界对齐的重叠：保留尾部完整段落，与句子分块策略一致
+                    if self.config.overlap > 0:
+                        keep = self._overlap_carry_index(current_pieces)
+                        current_pieces = current_pieces[keep:]
+                        current_starts = current_starts[keep:]
                     else:
-                        current_chunk = paragraph
+                        current_pieces = []
+                        current_starts = []
+                    current_pieces.append(paragraph)
+                    current_starts.append(para_start)
+                    current_len = sum(map(len, current_pieces)) + len(current_pieces) - 1
+                    current_start = current_starts[0]
+                    current_end = para_end
                 else:
                     # 单个段落太长，使用字符分块
-                    char_chunks = self._chunk_by_character(paragraph)
-                    chunks.extend(char_chunks)
-                    current_chunk = ""
+                    chunks.extend(self._chunk_by_character(paragraph, base=para_start))
+                    current_pieces = []
+                    current_starts = []
+                    current_len = 0
             else:
-                current_chunk += "\n" + paragraph if current_chunk else paragraph
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-        
+                if not current_pieces:
+                    current_start = para_start
+                    current_len = len(paragraph)
+                else:
+                    current_len += len(paragraph) + 1
+                current_pieces.append(paragraph)
+                current_starts.append(para_start)
+                current_end = para_end
+
+        if current_pieces:
+            chunks.append(("\n".join(current_pieces), current_start, current_end))
+
         return chunks
     
-    def _chunk_hierarchical(self, text: str) -> List[str]:
+    def _locate_chunks(self, text: str, pieces: List[str]) -> List[Tuple[str, int, int]]:
+        """为外部分块器产出的文本片段计算原文偏移
+
+        维护一个递增的搜索起点，只向前查找：整体是O(n)的单次扫描，
+        且重复出现的文本（如相同标题）会定位到正确的后续位置，
+        而不是总命中第一次出现。
+        """
+        located = []
+        pos = 0
+        for piece in pieces:
+            idx = text.find(piece, pos)
+            if idx < 0:
+                # 片段可能被分块器改写过（如去掉markdown标记），退化为估计位置
+                located.append((piece, pos, pos + len(piece)))
+            else:
+                located.append((piece, idx, idx + len(piece)))
+                pos = idx + len(piece)
+        return located
+
+    def _chunk_hierarchical(self, prepared: PreparedText) -> List[Tuple[str, int, int]]:
         """使用 HierarchicalChunker 进行层次化分块
         
         适用于包含标题、章节等结构的文档
         """
+        text = prepared.text
         if not self.hierarchical_chunker:
             logger.warning("HierarchicalChunker 不可用，回退到段落分块")
-            return self._chunk_by_paragraph(text)
+            return self._chunk_by_paragraph(prepared)
         
         try:
             # 将纯文本转换为 docling 的文档格式
             # 如果text是Markdown格式，可以直接使用
             # 否则尝试将其作为纯文本处理
             
-            # 简单的Markdown检测
-            is_markdown = bool(re.search(r'^#+\s|^\*\s|^-\s|```', text, re.MULTILINE))
-            
-            if is_markdown:
-                # 尝试使用 HierarchicalChunker
-                from docling.datamodel.document import Document
-                from docling.document_converter import DocumentConverter
-                
-                # 创建临时Markdown文件
-                import tempfile
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False, encoding='utf-8') as f:
-                    f.write(text)
-                    temp_path = f.name
-                
-                try:
-                    converter = DocumentConverter()
-                    doc = converter.convert(temp_path)
-                    chunk_result = list(self.hierarchical_chunker.chunk(doc))
-                    chunks = [chunk.text for chunk in chunk_result if chunk.text.strip()]
-                    return chunks
-                finally:
-                    Path(temp_path).unlink(missing_ok=True)
+            if prepared.is_markdown:
+                # 通过内存流转换，不落盘（省去临时文件的创建/删除和磁盘I/O）
+                import io
+                from docling.datamodel.base_models import DocumentStream
+
+                stream = DocumentStream(
+                    name="document.md",
+                    stream=io.BytesIO(text.encode('utf-8'))
+                )
+                doc = _get_document_converter().convert(stream)
+                chunk_result = list(self.hierarchical_chunker.chunk(doc))
+                pieces = [chunk.text for chunk in chunk_result if chunk.text.strip()]
+                return self._locate_chunks(text, pieces)
             else:
                 # 非Markdown文本，回退到段落分块
                 logger.info("文本不是Markdown格式，使用段落分块")
-                return self._chunk_by_paragraph(text)
+                return self._chunk_by_paragraph(prepared)
                 
         except Exception as e:
             logger.warning(f"HierarchicalChunker 处理失败: {e}，回退到段落分块")
-            return self._chunk_by_paragraph(text)
+            return self._chunk_by_paragraph(prepared)
     
-    def _chunk_hybrid(self, text: str) -> List[str]:
+    def _chunk_hybrid(self, prepared: PreparedText) -> List[Tuple[str, int, int]]:
         """混合策略：自动选择最佳分块方法
         
         1. 首先尝试层次化分块（如果文档有结构）
         2. 如果没有结构，使用段落分块
         3. 对于超长内容，使用字符分块
         """
-        # 检测文档类型
-        is_markdown = bool(re.search(r'^#+\s|^\*\s|^-\s|```', text, re.MULTILINE))
-        
-        if is_markdown and self.hierarchical_chunker:
+        if prepared.is_markdown and self.hierarchical_chunker:
             # 尝试层次化分块
             try:
-                hierarchical_chunks = self._chunk_hierarchical(text)
+                hierarchical_chunks = self._chunk_hierarchical(prepared)
                 # 检查是否有合理的分块（至少2个chunk）
                 if len(hierarchical_chunks) > 1:
                     return hierarchical_chunks
@@ -281,7 +461,7 @@ class HybridChunker:
                 logger.debug(f"层次化分块失败: {e}，继续尝试其他策略")
         
         # 回退到段落分块
-        return self._chunk_by_paragraph(text)
+        return self._chunk_by_paragraph(prepared)
     
     def chunk_to_strings(self, text: str) -> List[str]:
         """分块并仅返回文本列表（简化接口）"""
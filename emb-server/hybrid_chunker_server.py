@@ -20,21 +20,34 @@ uvicorn hybrid_chunker_server:app --host 0.0.0.0 --port 8081 --reload
 """
 
 import argparse
+import asyncio
+import functools
 import os
-import json
 import hashlib
+import struct
+import threading
 import time
-from typing import List, Optional, Dict
+from collections import OrderedDict
+from typing import Any, List, Optional, Dict
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+import orjson
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from loguru import logger
 
 from hybrid_chunker import HybridChunker, ChunkConfig
 
+try:
+    # 可选依赖：xxHash比MD5快一个数量级（SIMD实现）
+    import xxhash
+    _new_hasher = xxhash.xxh3_128
+except ImportError:
+    _new_hasher = hashlib.md5
+
 # ==================== 配置 ====================
 DEFAULT_CHUNK_SIZE = 500
 DEFAULT_OVERLAP = 50
@@ -52,6 +65,10 @@ class ChunkRequest(BaseModel):
     metadata: Optional[Dict] = Field(default=None, description="元数据（如文档ID、标题等）")
     save_chunks: Optional[bool] = Field(default=False, description="是否保存chunks以便下载")
 
+class BatchChunkRequest(BaseModel):
+    """批量分块请求"""
+    items: List[ChunkRequest] = Field(..., description="分块请求列表", min_items=1)
+
 class ChunkResponse(BaseModel):
     """分块响应"""
     chunk_id: str = Field(..., description="本次分块的唯一ID")
@@ -60,6 +77,11 @@ class ChunkResponse(BaseModel):
     config: Dict = Field(..., description="使用的配置")
     download_url: Optional[str] = Field(None, description="下载URL（如果save_chunks=True）")
 
+class BatchChunkResponse(BaseModel):
+    """批量分块响应"""
+    results: List[ChunkResponse] = Field(..., description="逐项分块结果")
+    count: int = Field(..., description="处理的请求数")
+
 class HealthResponse(BaseModel):
     """健康检查响应"""
     status: str = Field(..., description="服务状态")
@@ -73,6 +95,9 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # Startup: 初始化存储目录
     logger.info("🚀 HybridChunker 服务启动中...")
+    if getattr(app.state, "chunker", None) is None:
+        logger.info("检测到通过uvicorn直接启动，使用默认配置初始化分块器")
+        init_chunker(ChunkConfig(strategy=DEFAULT_STRATEGY))
     storage_dir = app.state.storage_dir
     if storage_dir:
         Path(storage_dir).mkdir(parents=True, exist_ok=True)
@@ -93,25 +118,57 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# 全局变量
-chunker: Optional[HybridChunker] = None
-chunk_config: Optional[ChunkConfig] = None
-storage_dir: Optional[str] = None
+# 运行时状态统一挂在app.state上（chunker/chunk_config/storage_dir），
+# 由init_chunker写入：避免模块级global的隐式共享，便于测试隔离
+class _LRUCache:
+    """线程安全的有界LRU缓存
+
+    原来的chunks_cache是无界dict，每次POST /chunks都插入完整分块结果
+    且从不淘汰，长期运行会随请求量线性泄漏内存直至OOM。
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
 
-# 内存存储（用于快速访问）
-chunks_cache: Dict[str, Dict] = {}
+# 内存存储（用于快速访问，最多保留最近1024次分块结果）
+chunks_cache = _LRUCache(maxsize=1024)
+
+
+@functools.lru_cache(maxsize=32)
+def _get_chunker(config: ChunkConfig) -> HybridChunker:
+    """按配置缓存HybridChunker实例
+
+    HybridChunker构造很重（可能初始化docling的HierarchicalChunker），
+    相同配置的请求复用同一个实例。ChunkConfig是frozen dataclass，
+    可直接作为lru_cache的key。
+    """
+    return HybridChunker(config)
 
 
 def init_chunker(config: ChunkConfig, storage_path: Optional[str] = None):
-    """初始化分块器"""
-    global chunker, chunk_config, storage_dir
-    
-    chunk_config = config
-    storage_dir = storage_path or DEFAULT_STORAGE_DIR
-    app.state.storage_dir = storage_dir
-    
+    """初始化分块器，状态写入app.state"""
+    app.state.chunk_config = config
+    app.state.storage_dir = storage_path or DEFAULT_STORAGE_DIR
+
     try:
-        chunker = HybridChunker(config)
+        app.state.chunker = HybridChunker(config)
         logger.success(f"✅ HybridChunker 初始化完成")
         logger.info(f"   策略: {config.strategy}")
         logger.info(f"   块大小: {config.chunk_size}")
@@ -127,6 +184,7 @@ def _save_chunks_to_file(chunk_id: str, chunks: List[Dict], metadata: Optional[D
     Returns:
         文件路径
     """
+    storage_dir = getattr(app.state, "storage_dir", None)
     if not storage_dir:
         raise ValueError("存储目录未设置")
     
@@ -144,8 +202,9 @@ def _save_chunks_to_file(chunk_id: str, chunks: List[Dict], metadata: Optional[D
         "chunks": chunks
     }
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # orjson直接输出UTF-8字节，比stdlib json快3-10倍
+    with open(file_path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
     
     logger.info(f"✅ 已保存chunks到文件: {file_path}")
     return str(file_path)
@@ -153,6 +212,7 @@ def _save_chunks_to_file(chunk_id: str, chunks: List[Dict], metadata: Optional[D
 
 def _load_chunks_from_file(chunk_id: str) -> Optional[Dict]:
     """从文件加载chunks"""
+    storage_dir = getattr(app.state, "storage_dir", None)
     if not storage_dir:
         return None
     
@@ -162,26 +222,33 @@ def _load_chunks_from_file(chunk_id: str) -> Optional[Dict]:
         return None
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
     except Exception as e:
         logger.error(f"❌ 加载chunks文件失败: {e}")
         return None
 
 
 def _generate_chunk_id(text: str, config: ChunkConfig) -> str:
-    """生成唯一的chunk_id"""
-    # 基于文本内容和配置生成ID
-    content = f"{text[:100]}_{config.chunk_size}_{config.overlap}_{config.strategy}_{time.time()}"
-    return hashlib.md5(content.encode()).hexdigest()
+    """生成内容寻址的chunk_id
+
+    对完整文本和生效配置做哈希，不掺入时间戳：
+    相同的文本+配置得到相同的ID，使chunks_cache能真正命中。
+    """
+    hasher = _new_hasher()
+    hasher.update(text.encode('utf-8'))
+    hasher.update(struct.pack('<ii', config.chunk_size, config.overlap))
+    hasher.update(config.strategy.encode('utf-8'))
+    return hasher.hexdigest()
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """健康检查"""
-    if chunker is None:
+    if getattr(app.state, "chunker", None) is None:
         raise HTTPException(status_code=503, detail="分块器未初始化")
     
+    chunk_config = app.state.chunk_config
     return HealthResponse(
         status="healthy",
         config={
@@ -189,76 +256,97 @@ async def health_check():
             "chunk_size": chunk_config.chunk_size,
             "overlap": chunk_config.overlap
         },
-        storage_dir=storage_dir
+        storage_dir=app.state.storage_dir
     )
 
 
-@app.post("/chunks", response_model=ChunkResponse)
-async def create_chunks(request: ChunkRequest):
-    """创建文本分块"""
-    if chunker is None:
-        raise HTTPException(status_code=503, detail="分块器未初始化")
-    
-    try:
-        logger.info(f"收到分块请求: 文本长度={len(request.text)}, 策略={request.strategy or 'default'}")
-        
-        # 验证文本
-        if not request.text or not request.text.strip():
-            raise HTTPException(status_code=400, detail="文本不能为空")
-        
-        # 使用请求中的配置或默认配置
+def _process_chunk_request(request: ChunkRequest) -> ChunkResponse:
+    """处理单个分块请求（同步，可在线程池中并发执行）"""
+    logger.info(f"收到分块请求: 文本长度={len(request.text)}, 策略={request.strategy or 'default'}")
+
+    chunker = app.state.chunker
+    chunk_config = app.state.chunk_config
+
+    # 验证文本
+    if not request.text or not request.text.strip():
+        raise HTTPException(status_code=400, detail="文本不能为空")
+
+    # 快路径：客户端未覆盖任何配置（绝大多数请求）时直接复用默认
+    # 配置对象，跳过每请求的ChunkConfig构造和字段比较
+    if request.chunk_size is None and request.overlap is None and request.strategy is None:
+        config = chunk_config
+    else:
         config = ChunkConfig(
             chunk_size=request.chunk_size or chunk_config.chunk_size,
             overlap=request.overlap if request.overlap is not None else chunk_config.overlap,
             strategy=request.strategy or chunk_config.strategy,
-            min_chunk_size=chunk_config.min_chunk_size,
-            max_chunk_size=chunk_config.max_chunk_size,
-            preserve_boundaries=chunk_config.preserve_boundaries
+            max_chunk_size=chunk_config.max_chunk_size
         )
-        
-        # 创建临时chunker（如果配置不同）
-        if (config.chunk_size != chunk_config.chunk_size or 
-            config.overlap != chunk_config.overlap or 
-            config.strategy != chunk_config.strategy):
-            temp_chunker = HybridChunker(config)
-            chunks = temp_chunker.chunk(request.text, metadata=request.metadata)
+
+    # 内容寻址的chunk_id：相同文本+配置直接复用缓存结果，跳过分块。
+    # 缓存的是不含请求元数据的chunks——chunk_id只哈希文本+配置，
+    # 相同文本、不同文档的请求命中同一条目，元数据必须按请求合并，
+    # 否则后来者会拿到先到请求的文档ID/标题
+    chunk_id = _generate_chunk_id(request.text, config)
+    cached = chunks_cache.get(chunk_id)
+    if cached is not None:
+        logger.info(f"✅ 命中分块缓存: chunk_id={chunk_id}")
+        base_chunks = cached["chunks"]
+    else:
+        if config is chunk_config:
+            base_chunks = chunker.chunk(request.text)
         else:
-            chunks = chunker.chunk(request.text, metadata=request.metadata)
-        
-        # 生成chunk_id
-        chunk_id = _generate_chunk_id(request.text, config)
-        
-        # 保存到缓存
-        chunks_cache[chunk_id] = {
-            "chunks": chunks,
+            # 覆盖了配置的请求使用按配置缓存的chunker实例
+            base_chunks = _get_chunker(config).chunk(request.text)
+        chunks_cache.put(chunk_id, {
+            "chunks": base_chunks,
             "config": {
                 "strategy": config.strategy,
                 "chunk_size": config.chunk_size,
                 "overlap": config.overlap
-            },
-            "metadata": request.metadata or {}
-        }
-        
-        # 如果请求保存，则保存到文件
-        download_url = None
-        if request.save_chunks:
-            _save_chunks_to_file(chunk_id, chunks, request.metadata)
-            download_url = f"/chunks/{chunk_id}/download"
-        
-        logger.success(f"✅ 文本分块完成: {len(chunks)}个chunks, chunk_id={chunk_id}")
-        
-        return ChunkResponse(
-            chunk_id=chunk_id,
-            chunks=chunks,
-            count=len(chunks),
-            config={
-                "strategy": config.strategy,
-                "chunk_size": config.chunk_size,
-                "overlap": config.overlap
-            },
-            download_url=download_url
-        )
-        
+            }
+        })
+
+    # 按本次请求合并文档元数据（chunk级字段保持原有的覆盖优先级）
+    if request.metadata:
+        chunks = [
+            {**c, "metadata": {**request.metadata, **c["metadata"]}}
+            for c in base_chunks
+        ]
+    else:
+        chunks = base_chunks
+
+    # 如果请求保存，则保存到文件
+    download_url = None
+    if request.save_chunks:
+        _save_chunks_to_file(chunk_id, chunks, request.metadata)
+        download_url = f"/chunks/{chunk_id}/download"
+
+    logger.success(f"✅ 文本分块完成: {len(chunks)}个chunks, chunk_id={chunk_id}")
+
+    return ChunkResponse(
+        chunk_id=chunk_id,
+        chunks=chunks,
+        count=len(chunks),
+        config={
+            "strategy": config.strategy,
+            "chunk_size": config.chunk_size,
+            "overlap": config.overlap
+        },
+        download_url=download_url
+    )
+
+
+@app.post("/chunks", response_model=ChunkResponse)
+async def create_chunks(request: ChunkRequest):
+    """创建文本分块"""
+    if getattr(app.state, "chunker", None) is None:
+        raise HTTPException(status_code=503, detail="分块器未初始化")
+
+    try:
+        # CPU密集的分块放到线程池执行，避免阻塞事件循环：
+        # 长文本分块可达秒级，同步调用会让其他请求全部排队
+        return await run_in_threadpool(_process_chunk_request, request)
     except HTTPException:
         raise
     except Exception as e:
@@ -266,12 +354,68 @@ async def create_chunks(request: ChunkRequest):
         raise HTTPException(status_code=500, detail=f"文本分块失败: {str(e)}")
 
 
+@app.post("/chunks/stream")
+async def create_chunks_stream(request: ChunkRequest):
+    """流式创建文本分块（NDJSON）
+
+    逐chunk序列化并写出（application/x-ndjson），不在服务端缓冲
+    完整结果列表：长文档的峰值内存从O(chunk数)降到O(1)，客户端
+    在分块结束前就能开始消费。同步生成器由starlette放到线程池
+    迭代，不阻塞事件循环。
+    """
+    if getattr(app.state, "chunker", None) is None:
+        raise HTTPException(status_code=503, detail="分块器未初始化")
+    if not request.text or not request.text.strip():
+        raise HTTPException(status_code=400, detail="文本不能为空")
+
+    chunk_config = app.state.chunk_config
+    if request.chunk_size is None and request.overlap is None and request.strategy is None:
+        req_chunker = app.state.chunker
+    else:
+        req_chunker = _get_chunker(ChunkConfig(
+            chunk_size=request.chunk_size or chunk_config.chunk_size,
+            overlap=request.overlap if request.overlap is not None else chunk_config.overlap,
+            strategy=request.strategy or chunk_config.strategy,
+            max_chunk_size=chunk_config.max_chunk_size
+        ))
+
+    def _ndjson_lines():
+        for chunk in req_chunker.chunk_iter(request.text, metadata=request.metadata):
+            yield orjson.dumps(chunk) + b"\n"
+
+    return StreamingResponse(_ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.post("/chunks/batch", response_model=BatchChunkResponse)
+async def create_chunks_batch(request: BatchChunkRequest):
+    """批量创建文本分块
+
+    一次HTTP调用处理多个文档，摊薄每请求的HTTP/JSON/pydantic固定开销；
+    各项在线程池中并发执行。
+    """
+    if getattr(app.state, "chunker", None) is None:
+        raise HTTPException(status_code=503, detail="分块器未初始化")
+
+    try:
+        results = await asyncio.gather(*[
+            run_in_threadpool(_process_chunk_request, item)
+            for item in request.items
+        ])
+        return BatchChunkResponse(results=list(results), count=len(results))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ 批量分块失败: {e}")
+        raise HTTPException(status_code=500, detail=f"批量分块失败: {str(e)}")
+
+
 @app.get("/chunks/{chunk_id}")
 async def get_chunks(chunk_id: str):
     """获取分块结果（通过chunk_id）"""
     # 先从缓存查找
-    if chunk_id in chunks_cache:
-        return JSONResponse(content=chunks_cache[chunk_id])
+    cached = chunks_cache.get(chunk_id)
+    if cached is not None:
+        return JSONResponse(content=cached)
     
     # 从文件加载
     data = _load_chunks_from_file(chunk_id)
@@ -284,16 +428,15 @@ async def get_chunks(chunk_id: str):
 @app.get("/chunks/{chunk_id}/download")
 async def download_chunks(
     chunk_id: str,
-    background_tasks: BackgroundTasks,
     format: str = Query(default="json", description="下载格式: json/txt", regex="^(json|txt)$")
 ):
-    """下载分块文件"""
+    """下载分块文件（流式响应，不经过临时文件）"""
     # 获取chunks数据
     data = None
     
     # 先从缓存查找
-    if chunk_id in chunks_cache:
-        cache_data = chunks_cache[chunk_id]
+    cache_data = chunks_cache.get(chunk_id)
+    if cache_data is not None:
         data = {
             "chunk_id": chunk_id,
             "created_at": time.time(),
@@ -307,50 +450,34 @@ async def download_chunks(
     if not data:
         raise HTTPException(status_code=404, detail=f"未找到chunk_id: {chunk_id}")
     
-    # 根据格式生成文件
+    # 直接序列化到响应流：无磁盘I/O、无临时文件清理路径
     if format == "json":
-        # 生成临时JSON文件
-        import tempfile
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8')
-        json.dump(data, temp_file, ensure_ascii=False, indent=2)
-        temp_file.close()
-        
-        # 添加到后台任务：下载后删除文件
-        background_tasks.add_task(lambda: Path(temp_file.name).unlink(missing_ok=True))
-        
-        return FileResponse(
-            temp_file.name,
+        content = orjson.dumps(data)
+        return StreamingResponse(
+            iter([content]),
             media_type="application/json",
-            filename=f"chunks_{chunk_id}.json"
+            headers={"Content-Disposition": f'attachment; filename="chunks_{chunk_id}.json"'}
         )
     elif format == "txt":
-        # 生成TXT文件
-        import tempfile
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8')
-        
-        # 写入TXT格式
-        temp_file.write(f"Chunk ID: {chunk_id}\n")
-        temp_file.write(f"Created At: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data.get('created_at', time.time())))}\n")
-        temp_file.write(f"Total Chunks: {len(data.get('chunks', []))}\n")
-        temp_file.write("=" * 80 + "\n\n")
-        
-        for idx, chunk in enumerate(data.get("chunks", []), 1):
-            temp_file.write(f"[Chunk {idx}]\n")
-            temp_file.write(f"Index: {chunk.get('index', idx-1)}\n")
-            temp_file.write(f"Length: {len(chunk.get('text', ''))} chars\n")
-            temp_file.write("-" * 80 + "\n")
-            temp_file.write(chunk.get("text", "") + "\n")
-            temp_file.write("=" * 80 + "\n\n")
-        
-        temp_file.close()
-        
-        # 添加到后台任务：下载后删除文件
-        background_tasks.add_task(lambda: Path(temp_file.name).unlink(missing_ok=True))
-        
-        return FileResponse(
-            temp_file.name,
+        def _txt_lines():
+            """逐chunk生成TXT内容，峰值内存与单个chunk成正比"""
+            yield f"Chunk ID: {chunk_id}\n"
+            yield f"Created At: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data.get('created_at', time.time())))}\n"
+            yield f"Total Chunks: {len(data.get('chunks', []))}\n"
+            yield "=" * 80 + "\n\n"
+
+            for idx, chunk in enumerate(data.get("chunks", []), 1):
+                yield f"[Chunk {idx}]\n"
+                yield f"Index: {chunk.get('index', idx-1)}\n"
+                yield f"Length: {len(chunk.get('text', ''))} chars\n"
+                yield "-" * 80 + "\n"
+                yield chunk.get("text", "") + "\n"
+                yield "=" * 80 + "\n\n"
+
+        return StreamingResponse(
+            _txt_lines(),
             media_type="text/plain",
-            filename=f"chunks_{chunk_id}.txt"
+            headers={"Content-Disposition": f'attachment; filename="chunks_{chunk_id}.txt"'}
         )
     else:
         raise HTTPException(status_code=400, detail=f"不支持的格式: {format}")
@@ -359,6 +486,7 @@ async def download_chunks(
 @app.get("/")
 async def root():
     """根路径"""
+    chunk_config = getattr(app.state, "chunk_config", None)
     return {
         "service": "HybridChunker Service",
         "version": "1.0.0",
@@ -367,10 +495,11 @@ async def root():
             "chunk_size": chunk_config.chunk_size if chunk_config else 0,
             "overlap": chunk_config.overlap if chunk_config else 0
         },
-        "storage_dir": storage_dir,
+        "storage_dir": getattr(app.state, "storage_dir", None),
         "endpoints": {
             "health": "/health",
             "create_chunks": "POST /chunks",
+            "create_chunks_batch": "POST /chunks/batch",
             "get_chunks": "GET /chunks/{chunk_id}",
             "download_chunks": "GET /chunks/{chunk_id}/download?format=json|txt",
             "docs": "/docs"
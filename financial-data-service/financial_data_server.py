@@ -17,14 +17,21 @@ uvicorn financial_data_server:app --host 0.0.0.0 --port 8081 --database-url post
 """
 
 import argparse
+import asyncio
 import os
+import time
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
 from typing import Dict, Optional, List, Any
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+import asyncpg
+import orjson
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
 from loguru import logger
 
 # ==================== 配置 ====================
@@ -63,6 +70,16 @@ class HistoricalPeriodsRequest(BaseModel):
     current_period: str = Field(..., description="当前报告期", json_schema_extra={"example": "2024-03-31"})
     count: int = Field(default=4, description="获取历史期数", ge=1, le=20)
 
+class BatchDataItem(BaseModel):
+    """批量查询中的单个标的"""
+    stock_code: str = Field(..., description="股票代码", json_schema_extra={"example": "000001"})
+    report_period: str = Field(..., description="报告期", json_schema_extra={"example": "2024-03-31"})
+
+class CompleteDataBatchRequest(BaseModel):
+    """批量完整财务数据查询请求"""
+    items: List[BatchDataItem] = Field(..., description="(股票, 报告期)列表", min_items=1, max_items=200)
+    report_type: str = Field(default="A", description="报表类型")
+
 class CompleteDataRequest(BaseModel):
     """完整财务数据查询请求"""
     stock_code: str = Field(..., description="股票代码", json_schema_extra={"example": "000001"})
@@ -73,27 +90,65 @@ class CompleteDataRequest(BaseModel):
 # ==================== FastAPI应用 ====================
 
 # 全局变量
-db_engine: Optional[Engine] = None
+db_pool: Optional[asyncpg.Pool] = None
 database_url: str = ""
 
-def init_database(db_url: str):
-    """初始化数据库连接"""
-    global db_engine, database_url
+
+def _to_asyncpg_dsn(db_url: str) -> str:
+    """将数据库URL规整为asyncpg可用的DSN"""
+    return db_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """连接初始化：jsonb直接解码为Python对象（orjson）"""
+    await conn.set_type_codec(
+        'jsonb',
+        encoder=lambda v: orjson.dumps(v).decode(),
+        decoder=orjson.loads,
+        schema='pg_catalog'
+    )
+
+
+async def init_database(db_url: str):
+    """初始化数据库连接池（原生asyncpg）
+
+    这些端点都是简单的单行prepared SELECT，SQLAlchemy Core的
+    编译器/结果代理开销占比极高；raw asyncpg把每请求的Python
+    开销压到最低。
+    """
+    global db_pool, database_url
     
     try:
         logger.info(f"正在连接数据库...")
         logger.info(f"数据库URL: {db_url.split('@')[-1]}")  # 只显示地址部分，隐藏密码
         
-        db_engine = create_engine(
-            db_url,
-            echo=False,
-            pool_pre_ping=True,  # 连接池健康检查
-            pool_recycle=3600  # 1小时回收连接
+        # 部署在PgBouncer（transaction池化）之后时由其统一管理后端
+        # 连接，本地不保持常驻连接避免双重池化
+        external_pool = bool(os.environ.get("FIN_DATA_EXTERNAL_POOL"))
+        pool_kwargs: Dict[str, Any] = dict(
+            min_size=5,
+            max_size=20,
+            max_inactive_connection_lifetime=3600,  # 1小时回收空闲连接
+        )
+        if external_pool:
+            # transaction池化下每个事务可能落到不同的后端连接，
+            # asyncpg隐式创建的命名prepared statement会随之漂移，
+            # 报"prepared statement does not exist"——禁用语句缓存；
+            # 空闲回收交给PgBouncer，本地不依赖会话复用
+            pool_kwargs.update(
+                min_size=0,
+                statement_cache_size=0,
+                max_inactive_connection_lifetime=60,
+            )
+
+        db_pool = await asyncpg.create_pool(
+            _to_asyncpg_dsn(db_url),
+            init=_init_connection,
+            **pool_kwargs
         )
         
         # 测试连接
-        with db_engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        await db_pool.fetchval("SELECT 1")
         
         database_url = db_url
         logger.success(f"✅ 数据库连接成功")
@@ -108,29 +163,294 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 财报数据服务启动中...")
 
     # uvicorn 以字符串模块路径启动时会重新导入本模块，
-    # db_engine 全局变量在新模块实例中为 None。
+    # db_pool 全局变量在新模块实例中为 None。
     # 通过环境变量传递数据库 URL，在 lifespan 中完成初始化。
-    if db_engine is None:
+    if db_pool is None:
         db_url = os.environ.get("FIN_DATA_DB_URL", "")
         if db_url:
-            init_database(db_url)
+            await init_database(db_url)
         else:
             logger.warning("⚠️ 数据库未初始化，请通过 --database-url 参数指定连接地址")
 
     yield
 
     # Shutdown: 关闭数据库连接
-    if db_engine:
-        db_engine.dispose()
+    if db_pool:
+        await db_pool.close()
         logger.info("🛑 数据库连接已关闭")
 
+def _orjson_default(obj: Any):
+    """orjson不原生支持的类型的序列化钩子
+
+    数据库返回的金额字段是Decimal，转为float输出JSON数值，
+    与单表端点（服务端to_jsonb产出数值）和jsonable_encoder的
+    Decimal处理一致；其余类型（date等）退化为str。
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return str(obj)
+
+
+class _ORJSONResponse(ORJSONResponse):
+    """默认响应类：orjson序列化，Decimal输出为数值"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+
 app = FastAPI(
     title="Financial Data Service",
     description="提供财报数据查询服务",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=_ORJSONResponse
+)
+
+# 财务JSON（complete-data约200个数值字段）gzip可压缩4-6倍；
+# 小响应（<500字节）不压，避免得不偿失
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
+# ==================== 结果缓存 ====================
+
+class _TTLCache:
+    """带TTL的有界LRU缓存
+
+    财报数据一经披露即不可变，相同(股票, 报告期, 报表类型)的
+    查询在TTL内直接命中内存，省去数据库往返。单事件循环内
+    dict操作不会被抢占，无需线程锁。
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (过期时刻, 值)
+
+    def get(self, key: tuple) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: Any):
+        self._data[key] = (time.monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+
+_statement_cache = _TTLCache()
+# 按key的asyncio.Lock：同一key的并发未命中只放一个请求去查库，
+# 其余等待后直接读缓存（防止缓存击穿）
+_statement_locks: Dict[tuple, asyncio.Lock] = {}
+
+
+async def _with_statement_cache(key: tuple, query) -> Optional[str]:
+    """缓存读→加锁二次检查→查询并回填
+
+    缓存值是序列化完成的JSON负载字符串；未命中数据（None）不缓存。
+    """
+    cached = _statement_cache.get(key)
+    if cached is not None:
+        return cached
+    lock = _statement_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            cached = _statement_cache.get(key)
+            if cached is not None:
+                return cached
+            value = await query()
+            if value is not None:
+                _statement_cache.put(key, value)
+            return value
+    finally:
+        _statement_locks.pop(key, None)
+
+# ==================== SQL语句 ====================
+
+# 三张表的字段表：(数据库列码, 输出名)。SELECT列表、批量查询的
+# 裸列码形式和Python侧的重命名元组都由它生成，字段只维护一处。
+_KEY_FIELDS = (
+    ("stkcd", "stkcd"),
+    ("accper", "accper"),
+    ("typrep", "typrep"),
+    ("short_name", "short_name"),
+)
+
+_INCOME_FIELDS = _KEY_FIELDS + (
+    ("b001101000", "revenue"),
+    ("b001201000", "cost"),
+    ("b001207000", "business_tax"),
+    ("b001209000", "sales_expense"),
+    ("b001210000", "admin_expense"),
+    ("b001216000", "rd_expense"),
+    ("b001211000", "finance_expense"),
+    ("b001211101", "interest_expense"),
+    ("b001300000", "operating_profit"),
+    ("b001000000", "total_profit"),
+    ("b002000000", "net_profit"),
+    ("b002000101", "net_profit_parent"),
+)
+
+_BALANCE_FIELDS = _KEY_FIELDS + (
+    ("a001100000", "current_assets"),
+    ("a001200000", "non_current_assets"),
+    ("a001000000", "total_assets"),
+    ("a002100000", "current_liabilities"),
+    ("a002200000", "non_current_liabilities"),
+    ("a002000000", "total_liabilities"),
+    ("a003000000", "total_equity"),
+    ("a003100000", "parent_equity"),
+    ("a001123000", "inventory"),
+    ("a002128000", "contract_liability"),
+    ("a001212000", "fixed_assets"),
+    ("a001107000", "trading_financial_assets"),
+    ("a001202000", "available_for_sale_assets"),
+    ("a001203000", "held_to_maturity_investments"),
+    ("a001205000", "long_term_equity_investment"),
+    ("a001226000", "debt_investments"),
+    ("a001228000", "other_equity_instruments_invest"),
+    ("a001229000", "other_noncurrent_financial_assets"),
+    ("a002101000", "short_term_borrowing"),
+    ("a002105000", "trading_financial_liabilities"),
+    ("a002125000", "current_noncurrent_liabilities"),
+    ("a002201000", "long_term_borrowing"),
+    ("a002203000", "bonds_payable"),
+    ("a002211000", "lease_liabilities"),
+)
+
+_CASHFLOW_FIELDS = _KEY_FIELDS + (
+    ("c001100000", "operating_cash_inflow"),
+    ("c001200000", "operating_cash_outflow"),
+    ("c001000000", "net_operating_cash_flow"),
+    ("c002100000", "investing_cash_inflow"),
+    ("c002200000", "investing_cash_outflow"),
+    ("c002000000", "net_investing_cash_flow"),
+    ("c003100000", "financing_cash_inflow"),
+    ("c003200000", "financing_cash_outflow"),
+    ("c003000000", "net_financing_cash_flow"),
+    ("c005000000", "net_cash_increase"),
 )
 
+_INCOME_TABLE = "ashare.a_share_income_statement"
+_BALANCE_TABLE = "ashare.a_share_balance_sheet"
+_CASHFLOW_TABLE = "ashare.a_share_cashflow_statement"
+
+# 输出名元组：批量查询按列序zip重命名用
+_INCOME_NAMES = tuple(alias for _, alias in _INCOME_FIELDS)
+_BALANCE_NAMES = tuple(alias for _, alias in _BALANCE_FIELDS)
+_CASHFLOW_NAMES = tuple(alias for _, alias in _CASHFLOW_FIELDS)
+
+
+def _build_single_sql(fields, table: str) -> str:
+    """单行查询主体。{period}为报告期谓词占位：
+    单表端点绑定$2，complete-data的上期分支绑定prev CTE结果。
+    参数约定：$1=股票代码, $2=报告期(date), $3=报表类型
+    """
+    cols = ",\n        ".join(
+        code if code == alias else f"{code} as {alias}" for code, alias in fields
+    )
+    return f"""
+    SELECT 
+        {cols}
+    FROM {table}
+    WHERE stkcd = $1
+        AND accper = {{period}}
+        AND typrep = $3
+    LIMIT 1"""
+
+
+_INCOME_BODY = _build_single_sql(_INCOME_FIELDS, _INCOME_TABLE)
+_BALANCE_BODY = _build_single_sql(_BALANCE_FIELDS, _BALANCE_TABLE)
+_CASHFLOW_BODY = _build_single_sql(_CASHFLOW_FIELDS, _CASHFLOW_TABLE)
+
+
+def _row_to_json_sql(body: str) -> str:
+    """把单行SELECT包装为服务端JSON聚合
+
+    PostgreSQL直接产出整行JSON文本，Python侧原样透传，
+    省去逐列构建dict和二次序列化（资产负债表25列收益最大）。
+    """
+    return f"SELECT row_to_json(t)::text AS j FROM ({body}) t"
+
+
+def _build_complete_sql(include_previous: bool) -> str:
+    """构建complete-data的单语句SQL
+
+    用CTE+UNION ALL把当期三张表（以及可选的上期查找和上期三张表）
+    合并为一次网络往返；每个分支to_jsonb打包成(tag, data)行，
+    由Python侧按tag分发。
+    """
+    cur = "$2"
+    arms = [
+        f"SELECT 'income_cur' AS tag, to_jsonb(t) AS data FROM ({_INCOME_BODY.format(period=cur)}) t",
+        f"SELECT 'balance_cur', to_jsonb(t) FROM ({_BALANCE_BODY.format(period=cur)}) t",
+        f"SELECT 'cash_cur', to_jsonb(t) FROM ({_CASHFLOW_BODY.format(period=cur)}) t",
+    ]
+    if not include_previous:
+        return "\nUNION ALL\n".join(arms)
+
+    prev = "(SELECT p FROM prev)"
+    arms += [
+        "SELECT 'prev_period', to_jsonb(p.p) FROM prev p WHERE p.p IS NOT NULL",
+        f"SELECT 'income_prev', to_jsonb(t) FROM ({_INCOME_BODY.format(period=prev)}) t",
+        f"SELECT 'balance_prev', to_jsonb(t) FROM ({_BALANCE_BODY.format(period=prev)}) t",
+        f"SELECT 'cash_prev', to_jsonb(t) FROM ({_CASHFLOW_BODY.format(period=prev)}) t",
+    ]
+    return (
+        "WITH prev AS (\n"
+        "    SELECT MAX(accper) AS p\n"
+        "    FROM ashare.a_share_income_statement\n"
+        "    WHERE stkcd = $1 AND accper < $2\n"
+        ")\n" + "\nUNION ALL\n".join(arms)
+    )
+
+
+# 模块级SQL常量：asyncpg按语句文本缓存prepared statement，
+# 复用同一字符串使解析/计划在连接生命周期内只发生一次
+_INCOME_STMT = _row_to_json_sql(_INCOME_BODY.format(period="$2"))
+_BALANCE_STMT = _row_to_json_sql(_BALANCE_BODY.format(period="$2"))
+_CASHFLOW_STMT = _row_to_json_sql(_CASHFLOW_BODY.format(period="$2"))
+
+# GROUP BY形式的去重：规划器可用(stkcd, accper, ...)复合索引同时
+# 完成去重和排序（Limit -> GroupAggregate -> Index Only Scan Backward），
+# 不再为DISTINCT建哈希表、为ORDER BY加排序节点
+_HISTORICAL_STMT = """
+    SELECT accper
+    FROM ashare.a_share_income_statement
+    WHERE stkcd = $1
+        AND accper < $2
+    GROUP BY accper
+    ORDER BY accper DESC
+    LIMIT $3
+"""
+
+_COMPLETE_STMT = _build_complete_sql(include_previous=True)
+_COMPLETE_STMT_CURRENT_ONLY = _build_complete_sql(include_previous=False)
+
+
+def _build_batch_sql(fields, table: str) -> str:
+    """批量查询：对(股票数组, 报告期数组)做unnest半连接
+
+    SELECT裸列码不做SQL别名：25列的别名每行都要在协议里回传
+    （~500字节列名→~250字节列码），改由Python侧按列序zip重命名。
+    参数约定：$1=text[]股票代码, $2=date[]报告期, $3=报表类型
+    """
+    return f"""
+    SELECT {', '.join(code for code, _ in fields)}
+    FROM {table}
+    WHERE (stkcd, accper) IN (SELECT sc, ap FROM unnest($1::text[], $2::date[]) AS t(sc, ap))
+        AND typrep = $3"""
+
+
+_INCOME_BATCH_SQL = _build_batch_sql(_INCOME_FIELDS, _INCOME_TABLE)
+_BALANCE_BATCH_SQL = _build_batch_sql(_BALANCE_FIELDS, _BALANCE_TABLE)
+_CASHFLOW_BATCH_SQL = _build_batch_sql(_CASHFLOW_FIELDS, _CASHFLOW_TABLE)
+
 # ==================== API端点 ====================
 
 @app.get("/", summary="服务信息")
@@ -139,7 +459,7 @@ async def root():
     return {
         "service": "Financial Data Service",
         "version": "1.0.0",
-        "database": "connected" if db_engine else "not connected",
+        "database": "connected" if db_pool else "not connected",
         "endpoints": {
             "health": "/health",
             "income_statement": "/api/income-statement",
@@ -154,12 +474,11 @@ async def root():
 @app.get("/health", response_model=HealthResponse, summary="健康检查")
 async def health_check():
     """健康检查"""
-    if db_engine is None:
+    if db_pool is None:
         raise HTTPException(status_code=503, detail="数据库未连接")
     
     try:
-        with db_engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        await db_pool.fetchval("SELECT 1")
         
         # 判断数据库类型
         db_type = "postgresql" if "postgresql" in database_url else "unknown"
@@ -172,196 +491,81 @@ async def health_check():
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"数据库连接异常: {str(e)}")
 
-@app.post("/api/income-statement", summary="查询利润表")
-async def get_income_statement(request: IncomeStatementRequest) -> Dict[str, Any]:
-    """获取利润表数据"""
-    if db_engine is None:
+async def _statement_endpoint(tag: str, stmt: str, logname: str, request) -> Response:
+    """三个单表端点的公共实现
+
+    同一查询形状只实现一次：缓存键→（必要时）查库→JSON透传。
+    此前complete-data还会层层调用这些handler，现在所有路径都
+    直接走SQL，不存在端点间递归。
+    """
+    if db_pool is None:
         raise HTTPException(status_code=503, detail="数据库未连接")
     
-    try:
-        query = text("""
-            SELECT 
-                stkcd, accper, typrep, short_name,
-                b001101000 as revenue,
-                b001201000 as cost,
-                b001207000 as business_tax,
-                b001209000 as sales_expense,
-                b001210000 as admin_expense,
-                b001216000 as rd_expense,
-                b001211000 as finance_expense,
-                b001211101 as interest_expense,
-                b001300000 as operating_profit,
-                b001000000 as total_profit,
-                b002000000 as net_profit,
-                b002000101 as net_profit_parent
-            FROM ashare.a_share_income_statement
-            WHERE stkcd = :stock_code
-                AND accper = :report_period
-                AND typrep = :report_type
-            LIMIT 1
-        """)
-        
-        with db_engine.connect() as conn:
-            result = conn.execute(
-                query,
-                {
-                    "stock_code": request.stock_code,
-                    "report_period": request.report_period,
-                    "report_type": request.report_type
-                }
-            ).fetchone()
+    key = (tag, request.stock_code, request.report_period, request.report_type)
+    
+    async def _query() -> Optional[str]:
+        try:
+            j = await db_pool.fetchval(
+                stmt,
+                request.stock_code,
+                date.fromisoformat(request.report_period),
+                request.report_type
+            )
             
-            if result:
-                data = dict(result._mapping)
-                logger.info(f"✅ 查询利润表: {request.stock_code} {request.report_period}")
-                return {"success": True, "data": data}
-            else:
-                logger.warning(f"⚠️ 未找到数据: {request.stock_code} {request.report_period}")
-                return {"success": False, "data": None, "message": "未找到数据"}
+            if j is not None:
+                logger.info(f"✅ {logname}: {request.stock_code} {request.report_period}")
+                return f'{{"success":true,"data":{j}}}'
+            logger.warning(f"⚠️ 未找到数据: {request.stock_code} {request.report_period}")
+            return None
                 
-    except Exception as e:
-        logger.error(f"❌ 查询失败: {e}")
-        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+        except Exception as e:
+            logger.error(f"❌ 查询失败: {e}")
+            raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+    
+    payload = await _with_statement_cache(key, _query)
+    if payload is None:
+        return Response(
+            content='{"success":false,"data":null,"message":"未找到数据"}',
+            media_type="application/json"
+        )
+    return Response(content=payload, media_type="application/json")
+
+
+@app.post("/api/income-statement", summary="查询利润表")
+async def get_income_statement(request: IncomeStatementRequest) -> Response:
+    """获取利润表数据"""
+    return await _statement_endpoint("income", _INCOME_STMT, "查询利润表", request)
+
 
 @app.post("/api/balance-sheet", summary="查询资产负债表")
-async def get_balance_sheet(request: BalanceSheetRequest) -> Dict[str, Any]:
+async def get_balance_sheet(request: BalanceSheetRequest) -> Response:
     """获取资产负债表数据"""
-    if db_engine is None:
-        raise HTTPException(status_code=503, detail="数据库未连接")
-    
-    try:
-        query = text("""
-            SELECT 
-                stkcd, accper, typrep, short_name,
-                a001100000 as current_assets,
-                a001200000 as non_current_assets,
-                a001000000 as total_assets,
-                a002100000 as current_liabilities,
-                a002200000 as non_current_liabilities,
-                a002000000 as total_liabilities,
-                a003000000 as total_equity,
-                a003100000 as parent_equity,
-                a001123000 as inventory,
-                a002128000 as contract_liability,
-                a001212000 as fixed_assets,
-                a001107000 as trading_financial_assets,
-                a001202000 as available_for_sale_assets,
-                a001203000 as held_to_maturity_investments,
-                a001205000 as long_term_equity_investment,
-                a001226000 as debt_investments,
-                a001228000 as other_equity_instruments_invest,
-                a001229000 as other_noncurrent_financial_assets,
-                a002101000 as short_term_borrowing,
-                a002105000 as trading_financial_liabilities,
-                a002125000 as current_noncurrent_liabilities,
-                a002201000 as long_term_borrowing,
-                a002203000 as bonds_payable,
-                a002211000 as lease_liabilities
-            FROM ashare.a_share_balance_sheet
-            WHERE stkcd = :stock_code
-                AND accper = :report_period
-                AND typrep = :report_type
-            LIMIT 1
-        """)
-        
-        with db_engine.connect() as conn:
-            result = conn.execute(
-                query,
-                {
-                    "stock_code": request.stock_code,
-                    "report_period": request.report_period,
-                    "report_type": request.report_type
-                }
-            ).fetchone()
-            
-            if result:
-                data = dict(result._mapping)
-                logger.info(f"✅ 查询资产负债表: {request.stock_code} {request.report_period}")
-                return {"success": True, "data": data}
-            else:
-                return {"success": False, "data": None, "message": "未找到数据"}
-                
-    except Exception as e:
-        logger.error(f"❌ 查询失败: {e}")
-        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+    return await _statement_endpoint("balance", _BALANCE_STMT, "查询资产负债表", request)
+
 
 @app.post("/api/cash-flow", summary="查询现金流量表")
-async def get_cash_flow(request: CashFlowRequest) -> Dict[str, Any]:
+async def get_cash_flow(request: CashFlowRequest) -> Response:
     """获取现金流量表数据"""
-    if db_engine is None:
-        raise HTTPException(status_code=503, detail="数据库未连接")
-    
-    try:
-        query = text("""
-            SELECT 
-                stkcd, accper, typrep, short_name,
-                c001100000 as operating_cash_inflow,
-                c001200000 as operating_cash_outflow,
-                c001000000 as net_operating_cash_flow,
-                c002100000 as investing_cash_inflow,
-                c002200000 as investing_cash_outflow,
-                c002000000 as net_investing_cash_flow,
-                c003100000 as financing_cash_inflow,
-                c003200000 as financing_cash_outflow,
-                c003000000 as net_financing_cash_flow,
-                c005000000 as net_cash_increase
-            FROM ashare.a_share_cashflow_statement
-            WHERE stkcd = :stock_code
-                AND accper = :report_period
-                AND typrep = :report_type
-            LIMIT 1
-        """)
-        
-        with db_engine.connect() as conn:
-            result = conn.execute(
-                query,
-                {
-                    "stock_code": request.stock_code,
-                    "report_period": request.report_period,
-                    "report_type": request.report_type
-                }
-            ).fetchone()
-            
-            if result:
-                data = dict(result._mapping)
-                logger.info(f"✅ 查询现金流量表: {request.stock_code} {request.report_period}")
-                return {"success": True, "data": data}
-            else:
-                return {"success": False, "data": None, "message": "未找到数据"}
-                
-    except Exception as e:
-        logger.error(f"❌ 查询失败: {e}")
-        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+    return await _statement_endpoint("cash", _CASHFLOW_STMT, "查询现金流量表", request)
+
 
 @app.post("/api/historical-periods", summary="查询历史期")
 async def get_historical_periods(request: HistoricalPeriodsRequest) -> Dict[str, Any]:
     """获取历史报告期列表"""
-    if db_engine is None:
+    if db_pool is None:
         raise HTTPException(status_code=503, detail="数据库未连接")
     
     try:
-        query = text("""
-            SELECT DISTINCT accper
-            FROM ashare.a_share_income_statement
-            WHERE stkcd = :stock_code
-                AND accper < :current_period
-            ORDER BY accper DESC
-            LIMIT :count
-        """)
+        results = await db_pool.fetch(
+            _HISTORICAL_STMT,
+            request.stock_code,
+            date.fromisoformat(request.current_period),
+            request.count
+        )
         
-        with db_engine.connect() as conn:
-            results = conn.execute(
-                query,
-                {
-                    "stock_code": request.stock_code,
-                    "current_period": request.current_period,
-                    "count": request.count
-                }
-            ).fetchall()
-            
-            periods = [str(row[0]) for row in results]
-            logger.info(f"✅ 查询历史期: {request.stock_code}, 共{len(periods)}期")
-            return {"success": True, "data": periods}
+        periods = [str(row[0]) for row in results]
+        logger.info(f"✅ 查询历史期: {request.stock_code}, 共{len(periods)}期")
+        return {"success": True, "data": periods}
                 
     except Exception as e:
         logger.error(f"❌ 查询失败: {e}")
@@ -370,7 +574,7 @@ async def get_historical_periods(request: HistoricalPeriodsRequest) -> Dict[str,
 @app.post("/api/complete-data", summary="查询完整财务数据")
 async def get_complete_data(request: CompleteDataRequest) -> Dict[str, Any]:
     """获取完整的财务数据（三张表 + 上期数据）"""
-    if db_engine is None:
+    if db_pool is None:
         raise HTTPException(status_code=503, detail="数据库未连接")
     
     try:
@@ -385,76 +589,28 @@ async def get_complete_data(request: CompleteDataRequest) -> Dict[str, Any]:
             "previous_data": None
         }
         
-        # 获取当期三张表
-        income_resp = await get_income_statement(
-            IncomeStatementRequest(
-                stock_code=request.stock_code,
-                report_period=request.report_period,
-                report_type=request.report_type
-            )
+        # 单语句取回全部数据：CTE+UNION ALL把当期三张表、上期查找
+        # 和上期三张表合并为一次网络往返（此前为六次独立查询）
+        stmt = _COMPLETE_STMT if request.include_previous else _COMPLETE_STMT_CURRENT_ONLY
+        rows = await db_pool.fetch(
+            stmt,
+            request.stock_code,
+            date.fromisoformat(request.report_period),
+            request.report_type
         )
-        result["income_statement"] = income_resp.get("data")
         
-        balance_resp = await get_balance_sheet(
-            BalanceSheetRequest(
-                stock_code=request.stock_code,
-                report_period=request.report_period,
-                report_type=request.report_type
-            )
-        )
-        result["balance_sheet"] = balance_resp.get("data")
+        tagged = {row['tag']: row['data'] for row in rows}
+        result["income_statement"] = tagged.get("income_cur")
+        result["balance_sheet"] = tagged.get("balance_cur")
+        result["cash_flow"] = tagged.get("cash_cur")
         
-        cash_resp = await get_cash_flow(
-            CashFlowRequest(
-                stock_code=request.stock_code,
-                report_period=request.report_period,
-                report_type=request.report_type
-            )
-        )
-        result["cash_flow"] = cash_resp.get("data")
-        
-        # 获取上期数据
-        if request.include_previous:
-            historical_resp = await get_historical_periods(
-                HistoricalPeriodsRequest(
-                    stock_code=request.stock_code,
-                    current_period=request.report_period,
-                    count=1
-                )
-            )
-            
-            if historical_resp.get("success") and historical_resp.get("data"):
-                previous_period = historical_resp["data"][0]
-                result["previous_period"] = previous_period
-                
-                # 获取上期三张表
-                prev_income = await get_income_statement(
-                    IncomeStatementRequest(
-                        stock_code=request.stock_code,
-                        report_period=previous_period,
-                        report_type=request.report_type
-                    )
-                )
-                prev_balance = await get_balance_sheet(
-                    BalanceSheetRequest(
-                        stock_code=request.stock_code,
-                        report_period=previous_period,
-                        report_type=request.report_type
-                    )
-                )
-                prev_cash = await get_cash_flow(
-                    CashFlowRequest(
-                        stock_code=request.stock_code,
-                        report_period=previous_period,
-                        report_type=request.report_type
-                    )
-                )
-                
-                result["previous_data"] = {
-                    "income_statement": prev_income.get("data"),
-                    "balance_sheet": prev_balance.get("data"),
-                    "cash_flow": prev_cash.get("data")
-                }
+        if request.include_previous and tagged.get("prev_period") is not None:
+            result["previous_period"] = tagged["prev_period"]
+            result["previous_data"] = {
+                "income_statement": tagged.get("income_prev"),
+                "balance_sheet": tagged.get("balance_prev"),
+                "cash_flow": tagged.get("cash_prev")
+            }
         
         logger.success(f"✅ 获取完整财务数据: {request.stock_code} {request.report_period}")
         return {"success": True, "data": result}
@@ -463,6 +619,53 @@ async def get_complete_data(request: CompleteDataRequest) -> Dict[str, Any]:
         logger.error(f"❌ 获取完整数据失败: {e}")
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
 
+@app.post("/api/complete-data-batch", summary="批量查询完整财务数据")
+async def get_complete_data_batch(request: CompleteDataBatchRequest) -> Dict[str, Any]:
+    """批量获取多只股票的三张报表（当期数据）
+
+    每张表对整个批次只执行一条语句，而不是按股票循环查询；
+    结果按请求顺序逐标的分组返回。
+    """
+    if db_pool is None:
+        raise HTTPException(status_code=503, detail="数据库未连接")
+    
+    try:
+        codes = [item.stock_code for item in request.items]
+        periods = [date.fromisoformat(item.report_period) for item in request.items]
+        
+        async with db_pool.acquire() as conn:
+            income_rows = await conn.fetch(_INCOME_BATCH_SQL, codes, periods, request.report_type)
+            balance_rows = await conn.fetch(_BALANCE_BATCH_SQL, codes, periods, request.report_type)
+            cash_rows = await conn.fetch(_CASHFLOW_BATCH_SQL, codes, periods, request.report_type)
+        
+        grouped: Dict[tuple, Dict[str, Any]] = {}
+        # 按列序zip重命名：O(列数)顺序构建，无逐键哈希查找
+        for field, names, rows in (("income_statement", _INCOME_NAMES, income_rows),
+                                   ("balance_sheet", _BALANCE_NAMES, balance_rows),
+                                   ("cash_flow", _CASHFLOW_NAMES, cash_rows)):
+            for row in rows:
+                renamed = dict(zip(names, row))
+                grouped.setdefault((renamed['stkcd'], str(renamed['accper'])), {})[field] = renamed
+        
+        pairs = [(item.stock_code, item.report_period) for item in request.items]
+        data = [
+            {
+                "stock_code": sc,
+                "report_period": rp,
+                "income_statement": grouped.get((sc, rp), {}).get("income_statement"),
+                "balance_sheet": grouped.get((sc, rp), {}).get("balance_sheet"),
+                "cash_flow": grouped.get((sc, rp), {}).get("cash_flow")
+            }
+            for sc, rp in pairs
+        ]
+        
+        logger.success(f"✅ 批量获取财务数据: {len(data)}个标的")
+        return {"success": True, "data": data, "count": len(data)}
+        
+    except Exception as e:
+        logger.error(f"❌ 批量查询失败: {e}")
+        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+
 # ==================== 命令行启动 ====================
 
 def main():
@@ -472,6 +675,11 @@ def main():
     parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="服务端口")
     parser.add_argument("--database-url", type=str, required=True, help="数据库连接URL")
     parser.add_argument("--reload", action="store_true", help="开启热重载（开发模式）")
+    parser.add_argument(
+        "--workers", type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        help="worker进程数（默认: WEB_CONCURRENCY环境变量或CPU核数）"
+    )
 
     args = parser.parse_args()
 
@@ -487,6 +695,11 @@ def main():
         host=args.host,
         port=args.port,
         reload=args.reload,
+        # reload模式与多worker互斥，开发模式下退回单worker
+        workers=args.workers if not args.reload else None,
+        # libuv事件循环：socket分发比默认selector循环快2-4倍，
+        # 对这种I/O代理型服务直接转化为吞吐
+        loop="uvloop",
         log_level="info"
     )
 
@@ -1,8 +1,9 @@
 import argparse
-import json
 import sys
 from pathlib import Path
 
+import orjson
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
@@ -29,7 +30,8 @@ def main():
     chunks = chunker.chunk_file(str(markdown_path))
     save_chunks_to_file(chunks, args.output)
 
-    print(json.dumps({"chunks": len(chunks), "output": args.output}, ensure_ascii=False, indent=2))
+    print(orjson.dumps({"chunks": len(chunks), "output": args.output},
+                       option=orjson.OPT_INDENT_2).decode())
 
 
 if __name__ == "__main__":
@@ -3,9 +3,16 @@ A股财报数据导入工具
 从Excel文件导入财报数据到PostgreSQL数据库（ashare schema）
 """
 
+import io
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import openpyxl
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_values
 from typing import Dict, List, Optional
 from pathlib import Path
 import logging
@@ -15,6 +22,15 @@ import sys
 from urllib.parse import urlparse
 from tqdm import tqdm
 
+# 可选：Arrow的C++ CSV写出器一次性产出COPY字节流
+# （缺失时自动回退到Python逐行格式化）
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -56,6 +72,10 @@ class FinancialDataImporter:
             raise ValueError("未找到数据库配置，请设置 DATABASE_URL 环境变量")
         
         self.conn = None
+        # 本连接上已建好暂存表并PREPARE了合并语句的目标表集合
+        self._prepared_tables = set()
+        # 列dtype索引缓存：同一文件的各数据块列结构完全相同
+        self._string_cols_cache = {}
         self._parse_db_config()
     
     def _parse_db_config(self):
@@ -80,6 +100,12 @@ class FinancialDataImporter:
                 user=self.db_config['user'],
                 password=self.db_config['password']
             )
+            # 导入是幂等批处理：关闭同步提交后commit不再等待WAL
+            # fsync（崩溃最坏情况是重跑一次导入，不会损坏数据）。
+            # COPY暂存用的TEMP表本身不写WAL，无需额外设置
+            with self.conn.cursor() as cursor:
+                cursor.execute("SET synchronous_commit TO OFF")
+            self._prepared_tables = set()
             logger.info("✅ 数据库连接成功")
         except Exception as e:
             logger.error(f"❌ 数据库连接失败: {e}")
@@ -126,6 +152,47 @@ class FinancialDataImporter:
         
         return df_mapped
     
+    def _iter_excel_chunks(self, excel_file: str, sheet_name: str = 'Sheet1',
+                           chunk_size: int = 10000):
+        """
+        以read_only模式流式读取Excel，按chunk_size行产出DataFrame
+
+        pd.read_excel会把整个sheet一次性载入内存；read_only的
+        openpyxl逐行迭代，峰值内存只与chunk_size成正比，大文件
+        导入不再受sheet总行数限制。
+
+        Args:
+            excel_file: Excel文件路径
+            sheet_name: sheet名称
+            chunk_size: 每块行数（默认10000）
+
+        Yields:
+            以表头为列名的DataFrame，每块最多chunk_size行
+        """
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+        try:
+            if sheet_name in workbook.sheetnames:
+                worksheet = workbook[sheet_name]
+            else:
+                worksheet = workbook.active
+
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(col) if col is not None else '' for col in header]
+
+            batch: List[tuple] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+
     def prepare_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         数据预处理
@@ -136,11 +203,17 @@ class FinancialDataImporter:
         Returns:
             处理后的DataFrame
         """
-        df_clean = df.copy()
-        
+        # 调用方传入的是map_column_names新建的frame且不再复用，
+        # 直接原地处理，省掉一次整表拷贝（峰值内存约减半）
+        df_clean = df
+
         # 处理股票代码（补齐为6位）
+        # 小字符串上列表推导快于astype(str).str.zfill的两趟pandas字符串核
         if 'stkcd' in df_clean.columns:
-            df_clean['stkcd'] = df_clean['stkcd'].astype(str).str.zfill(6)
+            df_clean['stkcd'] = [
+                f'{v:06d}' if isinstance(v, int) else str(v).zfill(6)
+                for v in df_clean['stkcd'].to_numpy()
+            ]
             logger.info(f"📋 股票代码格式化完成（补齐为6位）")
         
         # 处理日期字段
@@ -148,177 +221,330 @@ class FinancialDataImporter:
             df_clean['accper'] = pd.to_datetime(df_clean['accper'], errors='coerce')
             logger.info(f"📅 日期字段处理完成")
         
-        # 处理数值字段（将NaN转为None，以便插入NULL到数据库）
-        numeric_cols = df_clean.select_dtypes(include=['float64', 'int64']).columns
-        for col in numeric_cols:
-            df_clean[col] = df_clean[col].where(pd.notna(df_clean[col]), None)
+        # 数值字段保持原生dtype直达写入层，不再整块转object：
+        # COPY序列化器把NaN直接写成\N，回退路径在组元组时转None。
+        # 紧凑的float64块省掉一次全表object数组分配
         
         # 处理字符串字段（去除首尾空格）
-        string_cols = df_clean.select_dtypes(include=['object']).columns
+        # 对底层数组做一次列表推导，省去.apply的逐单元格pandas分派开销；
+        # object列可能混有数值，保留isinstance判断避免误转NaN。
+        # 列索引按(列名, dtype)签名记忆化，后续数据块免去select_dtypes
+        # 的全列遍历（排除日期字段accper）
+        signature = tuple(zip(df_clean.columns, map(str, df_clean.dtypes)))
+        string_cols = self._string_cols_cache.get(signature)
+        if string_cols is None:
+            string_cols = [
+                col for col, dtype in signature
+                if dtype == 'object' and col != 'accper'
+            ]
+            self._string_cols_cache[signature] = string_cols
         for col in string_cols:
-            if col not in ['accper']:  # 排除日期字段
-                df_clean[col] = df_clean[col].apply(
-                    lambda x: x.strip() if isinstance(x, str) else x
-                )
+            df_clean[col] = [
+                v.strip() if isinstance(v, str) else v
+                for v in df_clean[col].to_numpy()
+            ]
         
         logger.info(f"🔧 数据预处理完成，共 {len(df_clean):,} 行")
         return df_clean
     
-    def import_balance_sheet(self, excel_file: str, sheet_name: str = 'Sheet1'):
+    # 表配置：导入类型 -> (目标表, 主键, 中文名)
+    TABLE_CONFIGS = {
+        'balance_sheet': ('ashare.a_share_balance_sheet',
+                          ['stkcd', 'accper', 'typrep'], '资产负债表'),
+        'income_statement': ('ashare.a_share_income_statement',
+                             ['stkcd', 'accper', 'typrep'], '利润表'),
+        'cashflow_statement': ('ashare.a_share_cashflow_statement',
+                               ['stkcd', 'accper', 'typrep'], '现金流量表'),
+    }
+
+    def _import(self, excel_file: str, sheet_name: str, table_key: str):
         """
-        导入资产负债表
-        
+        统一导入入口：流式读取Excel并按块入库
+
+        读取在独立生产者线程中进行，按块经queue.Queue交给主线程做
+        列名映射、预处理和COPY入库——Excel解析（CPU）与数据库写入
+        （网络/磁盘）流水线重叠，而不是串行等待。
+
         Args:
             excel_file: Excel文件路径
             sheet_name: sheet名称
+            table_key: TABLE_CONFIGS中的表类型键
         """
+        table_name, primary_keys, label = self.TABLE_CONFIGS[table_key]
+
         logger.info(f"\n{'='*60}")
-        logger.info(f"📊 开始导入资产负债表: {excel_file}")
+        logger.info(f"📊 开始导入{label}: {excel_file}")
         logger.info(f"{'='*60}")
-        
-        # 读取Excel
-        df = pd.read_excel(excel_file, sheet_name=sheet_name)
-        logger.info(f"📖 读取Excel完成，共 {len(df)} 行, {len(df.columns)} 列")
-        
-        # 映射列名
-        df_mapped = self.map_column_names(df)
-        
-        # 数据预处理
-        df_clean = self.prepare_data(df_mapped)
-        
-        # 插入数据库
-        self._batch_insert(df_clean, 'ashare.a_share_balance_sheet', 
-                          primary_keys=['stkcd', 'accper', 'typrep'])
-        
-        logger.info(f"✅ 资产负债表导入完成\n")
-    
+
+        chunk_queue: "queue.Queue[Optional[pd.DataFrame]]" = queue.Queue(maxsize=4)
+        producer_error: List[BaseException] = []
+
+        def _producer():
+            try:
+                for chunk in self._iter_excel_chunks(excel_file, sheet_name):
+                    chunk_queue.put(chunk)
+            except BaseException as e:
+                producer_error.append(e)
+            finally:
+                chunk_queue.put(None)  # 结束哨兵
+
+        reader = threading.Thread(target=_producer, daemon=True)
+        reader.start()
+
+        total_rows = 0
+        while (df := chunk_queue.get()) is not None:
+            df_mapped = self.map_column_names(df)
+            df_clean = self.prepare_data(df_mapped)
+            self._batch_insert(df_clean, table_name, primary_keys=primary_keys)
+            total_rows += len(df)
+
+        reader.join()
+        if producer_error:
+            raise producer_error[0]
+
+        logger.info(f"📖 流式读取Excel完成，共 {total_rows} 行")
+        logger.info(f"✅ {label}导入完成\n")
+
+    def import_balance_sheet(self, excel_file: str, sheet_name: str = 'Sheet1'):
+        """
+        导入资产负债表
+
+        Args:
+            excel_file: Excel文件路径
+            sheet_name: sheet名称
+        """
+        self._import(excel_file, sheet_name, 'balance_sheet')
+
     def import_income_statement(self, excel_file: str, sheet_name: str = 'Sheet1'):
         """
         导入利润表
-        
+
         Args:
             excel_file: Excel文件路径
             sheet_name: sheet名称
         """
-        logger.info(f"\n{'='*60}")
-        logger.info(f"📊 开始导入利润表: {excel_file}")
-        logger.info(f"{'='*60}")
-        
-        # 读取Excel
-        df = pd.read_excel(excel_file, sheet_name=sheet_name)
-        logger.info(f"📖 读取Excel完成，共 {len(df)} 行, {len(df.columns)} 列")
-        
-        # 映射列名
-        df_mapped = self.map_column_names(df)
-        
-        # 数据预处理
-        df_clean = self.prepare_data(df_mapped)
-        
-        # 插入数据库
-        self._batch_insert(df_clean, 'ashare.a_share_income_statement',
-                          primary_keys=['stkcd', 'accper', 'typrep'])
-        
-        logger.info(f"✅ 利润表导入完成\n")
-    
+        self._import(excel_file, sheet_name, 'income_statement')
+
     def import_cashflow_statement(self, excel_file: str, sheet_name: str = 'Sheet1'):
         """
         导入现金流量表
-        
+
         Args:
             excel_file: Excel文件路径
             sheet_name: sheet名称
         """
-        logger.info(f"\n{'='*60}")
-        logger.info(f"📊 开始导入现金流量表: {excel_file}")
-        logger.info(f"{'='*60}")
-        
-        # 读取Excel
-        df = pd.read_excel(excel_file, sheet_name=sheet_name)
-        logger.info(f"📖 读取Excel完成，共 {len(df)} 行, {len(df.columns)} 列")
-        
-        # 映射列名
-        df_mapped = self.map_column_names(df)
-        
-        # 数据预处理
-        df_clean = self.prepare_data(df_mapped)
-        
-        # 插入数据库
-        self._batch_insert(df_clean, 'ashare.a_share_cashflow_statement',
-                          primary_keys=['stkcd', 'accper', 'typrep'])
-        
-        logger.info(f"✅ 现金流量表导入完成\n")
-    
-    def _batch_insert(self, df: pd.DataFrame, table_name: str, 
+        self._import(excel_file, sheet_name, 'cashflow_statement')
+
+    @staticmethod
+    def _format_value_for_copy(value) -> str:
+        """
+        将单元格格式化为COPY文本格式
+
+        None/NaN -> \\N（即NULL），bool -> t/f，日期 -> ISO格式，
+        字符串中的分隔符/换行/反斜杠按COPY规则转义
+        """
+        if value is None:
+            return r'\N'
+        if not isinstance(value, str) and pd.isna(value):
+            return r'\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        text = str(value)
+        if '\\' in text or '\t' in text or '\n' in text or '\r' in text:
+            text = (text.replace('\\', '\\\\')
+                        .replace('\t', '\\t')
+                        .replace('\n', '\\n')
+                        .replace('\r', '\\r'))
+        return text
+
+    def _ensure_staging(self, cursor, table_name: str, staging: str,
+                        stmt_name: str, upsert_sql: str):
+        """
+        会话级准备一次：建暂存表并PREPARE合并语句
+
+        暂存表用ON COMMIT DELETE ROWS（每次commit自动清空），
+        后续数据块只做COPY + EXECUTE，免去每块一次的建表catalog
+        操作和合并语句parse/plan。
+        """
+        if table_name in self._prepared_tables:
+            return
+        # IF NOT EXISTS：前一块commit后再失败回滚时，暂存表已随
+        # 早先的commit持久化到会话，重建会报relation already exists
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+            f"(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        cursor.execute(f"TRUNCATE {staging}")
+        cursor.execute(f"PREPARE {stmt_name} AS {upsert_sql}")
+        self._prepared_tables.add(table_name)
+
+    def _copy_upsert(self, cursor, df: pd.DataFrame, staging: str,
+                     columns: List[str], stmt_name: str):
+        """
+        COPY进TEMP暂存表，再EXECUTE预备好的UPSERT语句
+
+        Args:
+            cursor: 数据库游标
+            df: 要插入的DataFrame
+            staging: 暂存表名
+            columns: 列名列表
+            stmt_name: _ensure_staging里PREPARE的语句名
+        """
+        columns_str = ', '.join(columns)
+
+        if PYARROW_AVAILABLE:
+            # Arrow的C++ CSV写出器把类型转换和序列化合并为一趟原生
+            # 处理，宽表上比Python逐单元格格式化快一个数量级；
+            # 未加引号的空字段即CSV格式下的NULL
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            pa_csv.write_csv(
+                table, sink,
+                pa_csv.WriteOptions(include_header=False, delimiter='\t'),
+            )
+            cursor.copy_expert(
+                f"COPY {staging} ({columns_str}) FROM STDIN "
+                f"WITH (FORMAT csv, DELIMITER E'\\t')",
+                io.BytesIO(sink.getvalue().to_pybytes()),
+            )
+        else:
+            # 整个DataFrame序列化为一个COPY缓冲区（单次网络往返）。
+            # itertuples单趟遍历，不像to_numpy()那样先物化整块object数组
+            buf = io.StringIO()
+            fmt = self._format_value_for_copy
+            for row in df.itertuples(index=False, name=None):
+                buf.write('\t'.join(fmt(v) for v in row))
+                buf.write('\n')
+            buf.seek(0)
+            cursor.copy_from(buf, staging, sep='\t', null=r'\N', columns=columns)
+
+        cursor.execute(f"EXECUTE {stmt_name}")
+
+    def _batch_insert(self, df: pd.DataFrame, table_name: str,
                      primary_keys: List[str], batch_size: int = 500):
         """
-        批量插入数据（支持冲突更新，优化大数据集处理）
-        
+        批量插入数据（COPY暂存 + 单条UPSERT，支持冲突更新）
+
+        先把整个DataFrame以COPY写入TEMP暂存表（一次往返），再用单条
+        INSERT ... SELECT ... ON CONFLICT合并进目标表。相比逐行的
+        execute_batch省去每行一次的语句解析和往返，大数据集吞吐量
+        提升一个数量级。COPY路径失败时回退到原有的逐批INSERT方案。
+
         Args:
             df: 要插入的DataFrame
             table_name: 表名（包含schema）
             primary_keys: 主键字段列表
-            batch_size: 批次大小（默认500，适合大数据集）
+            batch_size: 回退路径的批次大小（默认500）
         """
         if df.empty:
             logger.warning("⚠️  DataFrame为空，跳过插入")
             return
-        
+
         # 获取列名
         columns = df.columns.tolist()
-        
-        # 生成SQL
-        placeholders = ', '.join(['%s'] * len(columns))
         columns_str = ', '.join(columns)
-        
+
         # 使用ON CONFLICT处理主键冲突（更新数据）
         update_columns = [col for col in columns if col not in primary_keys and col not in ['created_at']]
         update_str = ', '.join([f"{col} = EXCLUDED.{col}" for col in update_columns])
-        
+
         conflict_keys = ', '.join(primary_keys)
-        
-        sql = f"""
+
+        suffix = table_name.split('.')[-1]
+        staging = f"_stg_{suffix}"
+        stmt_name = f"upsert_{suffix}"
+
+        upsert_sql = f"""
             INSERT INTO {table_name} ({columns_str})
-            VALUES ({placeholders})
-            ON CONFLICT ({conflict_keys}) 
+            SELECT {columns_str} FROM {staging}
+            ON CONFLICT ({conflict_keys})
             DO UPDATE SET {update_str}, updated_at = CURRENT_TIMESTAMP
         """
-        
-        # 准备数据
+
         total_rows = len(df)
         logger.info(f"💾 准备插入 {total_rows:,} 条记录...")
-        
+
+        cursor = self.conn.cursor()
+        try:
+            self._ensure_staging(cursor, table_name, staging, stmt_name, upsert_sql)
+            self._copy_upsert(cursor, df, staging, columns, stmt_name)
+            self.conn.commit()
+            logger.info(f"✅ 成功插入/更新 {total_rows:,} 条记录到 {table_name}")
+            return
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"⚠️  COPY导入失败（{str(e)[:100]}），回退到逐批INSERT")
+            # PREPARE是会话级的不受回滚影响，暂存表若建于更早已
+            # commit的事务也会幸存：两者都清干净，下次调用整体重建，
+            # COPY路径在单个坏块之后仍可恢复
+            self._prepared_tables.clear()
+            try:
+                with self.conn.cursor() as c:
+                    c.execute("DEALLOCATE ALL")
+                    c.execute(f"DROP TABLE IF EXISTS {staging}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+        finally:
+            cursor.close()
+
+        self._batch_insert_rows(df, table_name, columns, primary_keys, batch_size)
+
+    def _batch_insert_rows(self, df: pd.DataFrame, table_name: str,
+                           columns: List[str], primary_keys: List[str],
+                           batch_size: int = 5000):
+        """
+        逐批INSERT回退路径（COPY不可用时使用）
+
+        使用execute_values把每批拼成单条多VALUES的INSERT语句，
+        服务端每批只解析一次；整个导入结束后统一commit一次，
+        避免每批一次WAL fsync。
+
+        Args:
+            df: 要插入的DataFrame
+            table_name: 表名（包含schema）
+            columns: 列名列表
+            primary_keys: 主键字段列表
+            batch_size: 批次大小（默认5000）
+        """
+        # 生成SQL（VALUES %s由execute_values展开为多行VALUES列表）
+        columns_str = ', '.join(columns)
+
+        update_columns = [col for col in columns if col not in primary_keys and col not in ['created_at']]
+        update_str = ', '.join([f"{col} = EXCLUDED.{col}" for col in update_columns])
+
+        conflict_keys = ', '.join(primary_keys)
+
+        sql = f"""
+            INSERT INTO {table_name} ({columns_str})
+            VALUES %s
+            ON CONFLICT ({conflict_keys})
+            DO UPDATE SET {update_str}, updated_at = CURRENT_TIMESTAMP
+        """
+
+        total_rows = len(df)
+
         # 分批处理
         cursor = self.conn.cursor()
-        success_count = 0
-        error_count = 0
-        
+
         try:
-            # 分批处理数据（带进度条）
-            for i in tqdm(range(0, total_rows, batch_size), 
-                         desc="插入进度", 
-                         unit="batch",
-                         ncols=100):
-                
-                # 获取当前批次的数据
-                batch_df = df.iloc[i:i+batch_size]
-                batch_data = [tuple(x) for x in batch_df.to_numpy()]
-                
-                try:
-                    # 插入当前批次
-                    execute_batch(cursor, sql, batch_data, page_size=batch_size)
-                    self.conn.commit()  # 每批次commit一次
-                    success_count += len(batch_data)
-                    
-                except Exception as e:
-                    self.conn.rollback()
-                    error_count += len(batch_data)
-                    logger.error(f"❌ 批次 {i//batch_size + 1} 插入失败: {str(e)[:100]}")
-                    continue
-            
-            logger.info(f"✅ 成功插入/更新 {success_count:,} 条记录到 {table_name}")
-            if error_count > 0:
-                logger.warning(f"⚠️  {error_count:,} 条记录插入失败")
-                
+            # 单趟itertuples按批消费，省去每批一次的iloc切片
+            # 和to_numpy() object数组物化（宽表上开销显著）；
+            # NaN在组元组时转None，由驱动写成NULL
+            rows = (
+                tuple(None if pd.isna(v) else v for v in row)
+                for row in df.itertuples(index=False, name=None)
+            )
+            with tqdm(total=total_rows, desc="插入进度", unit="row", ncols=100) as progress:
+                while batch_data := list(islice(rows, batch_size)):
+                    execute_values(cursor, sql, batch_data, page_size=1000)
+                    progress.update(len(batch_data))
+
+            self.conn.commit()  # 全部批次完成后统一commit
+            logger.info(f"✅ 成功插入/更新 {total_rows:,} 条记录到 {table_name}")
+
         except Exception as e:
             self.conn.rollback()
             logger.error(f"❌ 插入数据失败: {e}")
@@ -347,18 +573,33 @@ def main():
         logger.error(f"❌ 文件不存在: {args.file}")
         sys.exit(1)
     
+    # 待执行的导入任务
+    import_jobs = []
+    if args.table == 'balance_sheet' or args.table == 'all':
+        import_jobs.append('import_balance_sheet')
+    if args.table == 'income_statement' or args.table == 'all':
+        import_jobs.append('import_income_statement')
+    if args.table == 'cashflow_statement' or args.table == 'all':
+        import_jobs.append('import_cashflow_statement')
+
+    def _run_import(method_name: str):
+        # psycopg2连接不是线程安全的，每个线程各自建导入器和连接
+        with FinancialDataImporter() as importer:
+            getattr(importer, method_name)(args.file, args.sheet)
+
     # 执行导入
     try:
-        with FinancialDataImporter() as importer:
-            if args.table == 'balance_sheet' or args.table == 'all':
-                importer.import_balance_sheet(args.file, args.sheet)
-            
-            if args.table == 'income_statement' or args.table == 'all':
-                importer.import_income_statement(args.file, args.sheet)
-            
-            if args.table == 'cashflow_statement' or args.table == 'all':
-                importer.import_cashflow_statement(args.file, args.sheet)
-        
+        if len(import_jobs) > 1:
+            # 三张表相互独立，并行导入让Excel解析（CPU）与
+            # COPY写入（网络/磁盘）相互重叠
+            with ThreadPoolExecutor(max_workers=len(import_jobs)) as executor:
+                futures = [executor.submit(_run_import, name) for name in import_jobs]
+                for future in futures:
+                    future.result()
+        else:
+            for name in import_jobs:
+                _run_import(name)
+
         logger.info("\n" + "="*60)
         logger.info("🎉 所有数据导入完成！")
         logger.info("="*60)
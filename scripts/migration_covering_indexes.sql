@@ -0,0 +1,49 @@
+-- =====================================================
+-- 财报数据服务查询覆盖索引
+-- =====================================================
+-- 说明：financial-data-service 的所有查询都按
+--   stkcd = ? AND accper = ? AND typrep = ? LIMIT 1
+-- 过滤。为三张事实表建立 (stkcd, accper, typrep) 复合索引，
+-- 并用 INCLUDE 携带服务 SELECT 列表中的全部列，使查询成为
+-- index-only scan（单次索引元组读取，不回表）。
+--
+-- historical-periods 的
+--   SELECT DISTINCT accper ... ORDER BY accper DESC
+-- 同样受益：规划器可用该索引做反向扫描，省去排序节点。
+--
+-- 注意：CREATE INDEX CONCURRENTLY 不能在事务块内执行，
+-- 请直接用 psql -f 运行本文件（不要包在 BEGIN/COMMIT 中）。
+-- =====================================================
+
+-- 利润表
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_income_statement_key
+    ON ashare.a_share_income_statement (stkcd, accper, typrep)
+    INCLUDE (
+        short_name,
+        b001101000, b001201000, b001207000, b001209000,
+        b001210000, b001216000, b001211000, b001211101,
+        b001300000, b001000000, b002000000, b002000101
+    );
+
+-- 资产负债表
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_balance_sheet_key
+    ON ashare.a_share_balance_sheet (stkcd, accper, typrep)
+    INCLUDE (
+        short_name,
+        a001100000, a001200000, a001000000, a002100000,
+        a002200000, a002000000, a003000000, a003100000,
+        a001123000, a002128000, a001212000, a001107000,
+        a001202000, a001203000, a001205000, a001226000,
+        a001228000, a001229000, a002101000, a002105000,
+        a002125000, a002201000, a002203000, a002211000
+    );
+
+-- 现金流量表
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cashflow_statement_key
+    ON ashare.a_share_cashflow_statement (stkcd, accper, typrep)
+    INCLUDE (
+        short_name,
+        c001100000, c001200000, c001000000, c002100000,
+        c002200000, c002000000, c003100000, c003200000,
+        c003000000, c005000000
+    );
@@ -2,8 +2,13 @@
 
 通过HTTP接口访问财报数据服务，替代直接的数据库连接
 """
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, List, Any
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from loguru import logger
 
 from src.config.settings import settings
@@ -15,20 +20,63 @@ class FinancialDataHttpClient:
     通过HTTP接口访问独立的财报数据服务
     """
     
+    # 本地结果缓存容量与过期时间（财报数据按期发布，1小时内不会变化）
+    CACHE_MAXSIZE = 1024
+    CACHE_TTL = 3600.0
+    
     def __init__(self):
         """初始化HTTP客户端"""
         self.base_url = settings.FINANCIAL_DATA_API_URL
         self.timeout = settings.FINANCIAL_DATA_API_TIMEOUT
         
+        # Session + 连接池复用TCP连接（Keep-Alive），
+        # 避免每次请求都重新握手；瞬时网络错误自动重试
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.2,
+                              status_forcelist=(502, 503, 504)),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 结果缓存：一次报告生成会对同一(接口, 参数)组合反复查询
+        # （同业对比、多期趋势），命中后省掉整次HTTP往返。
+        # LRU+TTL，加锁保证get_all_statements的多线程访问安全
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         # 验证服务连接
         self._validate_connection()
     
+    def _cache_get(self, key: tuple) -> Optional[Any]:
+        """读取缓存，过期条目顺手清除"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, key: tuple, value: Any):
+        """写入缓存，超出容量时按LRU淘汰"""
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.CACHE_TTL, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_MAXSIZE:
+                self._cache.popitem(last=False)
+    
     def _validate_connection(self):
         """验证财报数据服务连接"""
         try:
             logger.info(f"正在连接财报数据服务: {self.base_url}")
             
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/health",
                 timeout=5
             )
@@ -59,8 +107,13 @@ class FinancialDataHttpClient:
         Returns:
             利润表数据字典，如果不存在返回None
         """
+        cache_key = ("income-statement", stock_code, report_period, report_type)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/income-statement",
                 json={
                     "stock_code": stock_code,
@@ -77,7 +130,10 @@ class FinancialDataHttpClient:
             
             if result.get("success"):
                 logger.info(f"✅ 获取利润表数据: {stock_code} {report_period}")
-                return result.get("data")
+                data = result.get("data")
+                if data is not None:
+                    self._cache_put(cache_key, data)
+                return data
             else:
                 logger.warning(f"⚠️ 未找到利润表数据: {stock_code} {report_period}")
                 return None
@@ -105,8 +161,13 @@ class FinancialDataHttpClient:
         Returns:
             资产负债表数据字典
         """
+        cache_key = ("balance-sheet", stock_code, report_period, report_type)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/balance-sheet",
                 json={
                     "stock_code": stock_code,
@@ -123,7 +184,10 @@ class FinancialDataHttpClient:
             
             if result.get("success"):
                 logger.info(f"✅ 获取资产负债表数据: {stock_code} {report_period}")
-                return result.get("data")
+                data = result.get("data")
+                if data is not None:
+                    self._cache_put(cache_key, data)
+                return data
             else:
                 logger.warning(f"⚠️ 未找到资产负债表数据: {stock_code} {report_period}")
                 return None
@@ -151,8 +215,13 @@ class FinancialDataHttpClient:
         Returns:
             现金流量表数据字典
         """
+        cache_key = ("cash-flow", stock_code, report_period, report_type)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/cash-flow",
                 json={
                     "stock_code": stock_code,
@@ -169,7 +238,10 @@ class FinancialDataHttpClient:
             
             if result.get("success"):
                 logger.info(f"✅ 获取现金流量表数据: {stock_code} {report_period}")
-                return result.get("data")
+                data = result.get("data")
+                if data is not None:
+                    self._cache_put(cache_key, data)
+                return data
             else:
                 logger.warning(f"⚠️ 未找到现金流量表数据: {stock_code} {report_period}")
                 return None
@@ -181,6 +253,40 @@ class FinancialDataHttpClient:
             logger.error(f"❌ 获取现金流量表数据失败: {e}")
             return None
     
+    def get_all_statements(
+        self,
+        stock_code: str,
+        report_period: str,
+        report_type: str = "A"
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """并发获取三张报表数据
+
+        三个请求相互独立，用线程池同时发出，整体耗时约等于最慢的
+        一个请求而不是三者之和；Session连接池可安全地被多线程复用
+
+        Args:
+            stock_code: 股票代码
+            report_period: 报告期
+            report_type: 报表类型
+
+        Returns:
+            {"income_statement": ..., "balance_sheet": ..., "cash_flow": ...}，
+            缺失的表对应值为None
+        """
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                "income_statement": executor.submit(
+                    self.get_income_statement, stock_code, report_period, report_type
+                ),
+                "balance_sheet": executor.submit(
+                    self.get_balance_sheet, stock_code, report_period, report_type
+                ),
+                "cash_flow": executor.submit(
+                    self.get_cash_flow, stock_code, report_period, report_type
+                ),
+            }
+            return {name: future.result() for name, future in futures.items()}
+
     def get_historical_periods(
         self,
         stock_code: str,
@@ -197,8 +303,13 @@ class FinancialDataHttpClient:
         Returns:
             历史报告期列表（降序）
         """
+        cache_key = ("historical-periods", stock_code, current_period, count)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/historical-periods",
                 json={
                     "stock_code": stock_code,
@@ -216,6 +327,8 @@ class FinancialDataHttpClient:
             if result.get("success"):
                 periods = result.get("data", [])
                 logger.info(f"✅ 获取历史期数: {len(periods)}期")
+                if periods:
+                    self._cache_put(cache_key, periods)
                 return periods
             else:
                 return []
@@ -246,7 +359,7 @@ class FinancialDataHttpClient:
             包含三张表的完整数据
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/complete-data",
                 json={
                     "stock_code": stock_code,
@@ -277,6 +390,7 @@ class FinancialDataHttpClient:
             return {}
     
     def close(self):
-        """关闭连接（HTTP客户端无需显式关闭）"""
+        """关闭连接，释放Session连接池"""
+        self.session.close()
         logger.info("财报数据HTTP客户端已关闭")
 
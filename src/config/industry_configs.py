@@ -3,13 +3,17 @@
 根据不同行业定义核心指标、辅助指标和个性化指标
 支持行业扩展
 """
-from typing import List, Dict, Any, Optional
+from typing import FrozenSet, Iterator, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
 
-class IndicatorPriority(str, Enum):
-    """指标优先级"""
+class IndicatorPriority(Enum):
+    """指标优先级
+
+    纯Enum成员是单例，比较和哈希走对象标识而非str逐字符比较；
+    需要字符串形式时显式取.value
+    """
     CORE = "core"  # 核心指标
     AUXILIARY = "auxiliary"  # 辅助指标
     SPECIFIC = "specific"  # 个性化指标
@@ -41,23 +45,62 @@ class IndustryConfig:
     name: str  # 行业名称
     description: str  # 行业描述
     characteristics: List[IndustryCharacteristics]  # 行业特征
-    indicators: List[IndicatorConfig]  # 指标配置列表
-    
-    def get_indicators_by_priority(self, priority: IndicatorPriority) -> List[IndicatorConfig]:
+    indicators: Tuple[IndicatorConfig, ...]  # 指标配置（构造后不可变）
+    # 按优先级预分桶的指标索引（构造后指标列表不变，一次分组即可）
+    _by_priority: Dict[IndicatorPriority, Tuple[IndicatorConfig, ...]] = field(
+        init=False, repr=False, default_factory=dict
+    )
+    # 全部指标涉及的数据库字段去重集合（多个指标共用同一字段，
+    # 如营业收入出现在3个指标里），供按列投影查询使用
+    required_db_fields: FrozenSet[str] = field(init=False, repr=False, default=frozenset())
+
+    def __post_init__(self):
+        # 统一存为元组：比列表省掉预留空间，且各处共享同一对象安全
+        self.indicators = tuple(self.indicators)
+        buckets: Dict[IndicatorPriority, List[IndicatorConfig]] = {}
+        for ind in self.indicators:
+            buckets.setdefault(ind.priority, []).append(ind)
+        self._by_priority = {p: tuple(inds) for p, inds in buckets.items()}
+        self.required_db_fields = frozenset(
+            f for ind in self.indicators for f in ind.db_fields
+        )
+
+    def get_indicators_by_priority(self, priority: IndicatorPriority) -> Tuple[IndicatorConfig, ...]:
         """按优先级获取指标"""
-        return [ind for ind in self.indicators if ind.priority == priority]
-    
-    def get_core_indicators(self) -> List[IndicatorConfig]:
+        return self._by_priority.get(priority, ())
+
+    def iter_indicators_by_priority(self, priority: IndicatorPriority) -> Iterator[IndicatorConfig]:
+        """按优先级惰性遍历指标（只需枚举时免去整组取出）"""
+        return iter(self._by_priority.get(priority, ()))
+
+    # 属性形式的访问入口：分桶在__post_init__一次建好，
+    # 这里只是查预分桶dict取同一个元组，无需cached_property再缓存
+    @property
+    def core_indicators(self) -> Tuple[IndicatorConfig, ...]:
+        """核心指标"""
+        return self._by_priority.get(IndicatorPriority.CORE, ())
+
+    @property
+    def auxiliary_indicators(self) -> Tuple[IndicatorConfig, ...]:
+        """辅助指标"""
+        return self._by_priority.get(IndicatorPriority.AUXILIARY, ())
+
+    @property
+    def specific_indicators(self) -> Tuple[IndicatorConfig, ...]:
+        """个性化指标"""
+        return self._by_priority.get(IndicatorPriority.SPECIFIC, ())
+
+    def get_core_indicators(self) -> Tuple[IndicatorConfig, ...]:
         """获取核心指标"""
-        return self.get_indicators_by_priority(IndicatorPriority.CORE)
-    
-    def get_auxiliary_indicators(self) -> List[IndicatorConfig]:
+        return self.core_indicators
+
+    def get_auxiliary_indicators(self) -> Tuple[IndicatorConfig, ...]:
         """获取辅助指标"""
-        return self.get_indicators_by_priority(IndicatorPriority.AUXILIARY)
-    
-    def get_specific_indicators(self) -> List[IndicatorConfig]:
+        return self.auxiliary_indicators
+
+    def get_specific_indicators(self) -> Tuple[IndicatorConfig, ...]:
         """获取个性化指标"""
-        return self.get_indicators_by_priority(IndicatorPriority.SPECIFIC)
+        return self.specific_indicators
 
 
 # ==================== 计算机行业配置 ====================
@@ -168,36 +211,34 @@ class IndustryConfigManager:
     """行业配置管理器"""
     
     def __init__(self):
-        self._configs: Dict[str, IndustryConfig] = {
-            "computer": COMPUTER_INDUSTRY_CONFIG,
-        }
-    
+        self._configs: Dict[str, IndustryConfig] = {}
+        # 名称 -> 配置的二级索引，按名称查询无需遍历全部配置
+        self._by_name: Dict[str, IndustryConfig] = {}
+        self.register_config(COMPUTER_INDUSTRY_CONFIG)
+
     def get_config(self, industry: str) -> IndustryConfig:
         """获取行业配置
-        
+
         Args:
             industry: 行业代码或名称
-            
+
         Returns:
             行业配置
-            
+
         Raises:
             ValueError: 行业不存在
         """
-        # 支持通过代码或名称查询
-        if industry in self._configs:
-            return self._configs[industry]
-        
-        # 尝试通过名称查询
-        for config in self._configs.values():
-            if config.name == industry:
-                return config
-        
+        # 支持通过代码或名称查询（两个dict各查一次，均为O(1)）
+        config = self._configs.get(industry) or self._by_name.get(industry)
+        if config is not None:
+            return config
+
         raise ValueError(f"不支持的行业: {industry}，当前支持: {list(self._configs.keys())}")
-    
+
     def register_config(self, config: IndustryConfig):
         """注册新的行业配置"""
         self._configs[config.code] = config
+        self._by_name[config.name] = config
     
     def list_industries(self) -> List[str]:
         """列出所有支持的行业"""
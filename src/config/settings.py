@@ -1,7 +1,7 @@
 """配置管理模块"""
 import os
 from pathlib import Path
-from typing import Optional
+from typing import ClassVar, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -9,6 +9,9 @@ from pydantic import Field
 class Settings(BaseSettings):
     """应用配置"""
     
+    # 目录是否已创建（类级标记，跨实例共享）
+    _dirs_ready: ClassVar[bool] = False
+    
     # 项目基础配置
     APP_NAME: str = "财报点评系统"
     APP_VERSION: str = "1.0.0"
@@ -77,15 +80,27 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = True
+        # 配置在启动后不可变，冻结实例防止运行期误改
+        frozen = True
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # 创建必要的目录
-        self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        self.REPORT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        self.PDF_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+        # 创建必要的目录（只做一次：Streamlit热重载/测试夹具会
+        # 反复实例化，跳过重复的stat+mkdir系统调用）
+        if not Settings._dirs_ready:
+            self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            self.REPORT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            self.PDF_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+            Settings._dirs_ready = True
 
 
 # 全局配置实例
 settings = Settings()
 
+# 热路径常量：循环内高频访问的配置直接以模块属性暴露，
+# 访问是一次全局查找，省去pydantic的描述符链
+EMBEDDING_BATCH_SIZE = settings.EMBEDDING_BATCH_SIZE
+EMBEDDING_DIM = settings.EMBEDDING_DIM
+EMBEDDING_MODEL = settings.EMBEDDING_MODEL
+CACHE_TTL = settings.CACHE_TTL
+
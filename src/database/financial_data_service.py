@@ -2,23 +2,212 @@
 
 从PostgreSQL数据库获取结构化的财报数据
 """
-from typing import Dict, Optional, List, Any
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Dict, FrozenSet, Mapping, Optional, List, Any, Tuple
 from datetime import datetime
 from loguru import logger
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.engine import Connection, Engine
 
 from src.config.settings import settings
 
 
+# ==================== 三张表的SELECT列表 ====================
+# 单期查询与complete-data的双期合并查询共用同一份列定义，
+# 避免两处维护同样的字段别名
+
+_INCOME_SELECT = """
+    SELECT
+        stkcd,
+        accper,
+        typrep,
+        short_name,
+        -- 营业收入
+        b001101000 as revenue,
+        -- 营业成本
+        b001201000 as cost,
+        -- 税金及附加
+        b001207000 as business_tax,
+        -- 销售费用
+        b001209000 as sales_expense,
+        -- 管理费用
+        b001210000 as admin_expense,
+        -- 研发费用
+        b001216000 as rd_expense,
+        -- 财务费用
+        b001211000 as finance_expense,
+        -- 营业利润
+        b001300000 as operating_profit,
+        -- 利润总额
+        b001000000 as total_profit,
+        -- 净利润
+        b002000000 as net_profit,
+        -- 归属于母公司所有者的净利润
+        b002000101 as net_profit_parent
+    FROM ashare.a_share_income_statement
+"""
+
+_BALANCE_SELECT = """
+    SELECT
+        stkcd,
+        accper,
+        typrep,
+        short_name,
+        -- 资产
+        a001100000 as current_assets,
+        a001200000 as non_current_assets,
+        a001000000 as total_assets,
+        -- 负债
+        a002100000 as current_liabilities,
+        a002200000 as non_current_liabilities,
+        a002000000 as total_liabilities,
+        -- 股东权益
+        a003000000 as total_equity,
+        a003100000 as parent_equity,
+        -- 特殊项目
+        a001123000 as inventory,  -- 存货
+        a002128000 as contract_liability  -- 合同负债
+    FROM ashare.a_share_balance_sheet
+"""
+
+_CASHFLOW_SELECT = """
+    SELECT
+        stkcd,
+        accper,
+        typrep,
+        short_name,
+        -- 经营活动现金流
+        c001100000 as operating_cash_inflow,
+        c001200000 as operating_cash_outflow,
+        c001000000 as net_operating_cash_flow,
+        -- 投资活动现金流
+        c002100000 as investing_cash_inflow,
+        c002200000 as investing_cash_outflow,
+        c002000000 as net_investing_cash_flow,
+        -- 筹资活动现金流
+        c003100000 as financing_cash_inflow,
+        c003200000 as financing_cash_outflow,
+        c003000000 as net_financing_cash_flow,
+        -- 现金净增加额
+        c005000000 as net_cash_increase
+    FROM ashare.a_share_cashflow_statement
+"""
+
+_SINGLE_PERIOD_WHERE = """
+    WHERE stkcd = :stock_code
+        AND accper = :report_period
+        AND typrep = :report_type
+    LIMIT 1
+"""
+
+# 双期查询：当期与上期一次取回，省一半往返
+_TWO_PERIOD_WHERE = """
+    WHERE stkcd = :stock_code
+        AND accper IN (:current_period, :previous_period)
+        AND typrep = :report_type
+"""
+
+# ==================== 预构建的语句对象 ====================
+# text()在模块加载时构建一次，配合engine的compiled_cache，
+# 热路径上免去每次调用的语句对象创建和重编译
+
+_INCOME_SQL = text(_INCOME_SELECT + _SINGLE_PERIOD_WHERE)
+_BALANCE_SQL = text(_BALANCE_SELECT + _SINGLE_PERIOD_WHERE)
+_CASHFLOW_SQL = text(_CASHFLOW_SELECT + _SINGLE_PERIOD_WHERE)
+
+_INCOME_TWO_PERIOD_SQL = text(_INCOME_SELECT + _TWO_PERIOD_WHERE)
+_BALANCE_TWO_PERIOD_SQL = text(_BALANCE_SELECT + _TWO_PERIOD_WHERE)
+_CASHFLOW_TWO_PERIOD_SQL = text(_CASHFLOW_SELECT + _TWO_PERIOD_WHERE)
+
+# 批量查询：任意多个(股票, 报告期)组合一次取回，
+# expanding bindparam把元组列表展开为多行IN列表
+_BATCH_WHERE = """
+    WHERE (stkcd, accper) IN :keys
+        AND typrep = :report_type
+"""
+
+_INCOME_BATCH_SQL = text(_INCOME_SELECT + _BATCH_WHERE).bindparams(
+    bindparam("keys", expanding=True)
+)
+_BALANCE_BATCH_SQL = text(_BALANCE_SELECT + _BATCH_WHERE).bindparams(
+    bindparam("keys", expanding=True)
+)
+_CASHFLOW_BATCH_SQL = text(_CASHFLOW_SELECT + _BATCH_WHERE).bindparams(
+    bindparam("keys", expanding=True)
+)
+
+# ==================== 按列投影查询 ====================
+# 行业配置的required_db_fields只覆盖各表的少数几列，
+# 按需SELECT比整行取回少传约60%的数据量。
+# 列名按首字母路由到对应报表：a=资产负债表 b=利润表 c=现金流量表
+
+_PROJECTION_TABLES = {
+    "a": "ashare.a_share_balance_sheet",
+    "b": "ashare.a_share_income_statement",
+    "c": "ashare.a_share_cashflow_statement",
+}
+
+# 列名白名单模式：仅放行CSMAR风格的报表科目编码，
+# 列表拼进SQL前逐一校验，杜绝注入
+_PROJECTION_COLUMN_RE = re.compile(r"^[abc]\d{9}$")
+
+_HIST_SQL = text("""
+    SELECT DISTINCT accper
+    FROM ashare.a_share_income_statement
+    WHERE stkcd = :stock_code
+        AND accper < :current_period
+    ORDER BY accper DESC
+    LIMIT :count
+""")
+
+
 class FinancialDataService:
     """财务数据服务"""
-    
+
+    # 结果缓存容量与过期时间（财报数据仅在重新导入后变化）
+    CACHE_MAXSIZE = 1024
+    CACHE_TTL = 3600.0
+
     def __init__(self):
         """初始化数据库连接"""
         self.engine: Optional[Engine] = None
+        # 结果缓存：一次报告生成会以相同参数反复调用历史期数和
+        # 完整数据查询（同业对比、多期趋势），LRU+TTL有界缓存，
+        # 加锁保证多线程调用安全
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         self._connect()
-    
+
+    def _cache_get(self, key: tuple) -> Optional[Any]:
+        """读取缓存，过期条目顺手清除"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key: tuple, value: Any):
+        """写入缓存，超出容量时按LRU淘汰"""
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.CACHE_TTL, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_MAXSIZE:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        """清空结果缓存（重新导入数据后调用）"""
+        with self._cache_lock:
+            self._cache.clear()
+
     def _connect(self):
         """连接数据库"""
         try:
@@ -26,7 +215,13 @@ class FinancialDataService:
                 settings.DATABASE_URL,
                 echo=settings.DATABASE_ECHO,
                 pool_pre_ping=True,  # 连接池健康检查
-                pool_recycle=3600  # 1小时回收连接
+                pool_recycle=3600,  # 1小时回收连接
+                # 多用户并发生成报告时默认5个常驻连接不够用，
+                # 放大常驻池并允许突发溢出（溢出连接用完即弃）
+                pool_size=20,
+                max_overflow=10,
+                # 专用编译缓存：同一批语句常驻，不与其他engine争抢
+                execution_options={"compiled_cache": {}}
             )
             # 测试连接
             with self.engine.connect() as conn:
@@ -35,258 +230,272 @@ class FinancialDataService:
         except Exception as e:
             logger.error(f"❌ 数据库连接失败: {e}")
             raise
-    
+
+    def _connection(self, conn: Optional[Connection] = None):
+        """复用外部连接，未提供时从连接池取一个
+
+        外部传入的连接由调用方负责关闭（nullcontext不关闭）
+        """
+        if conn is not None:
+            return nullcontext(conn)
+        return self.engine.connect()
+
     def get_income_statement(
         self,
         stock_code: str,
         report_period: str,
-        report_type: str = "A"
-    ) -> Optional[Dict[str, Any]]:
+        report_type: str = "A",
+        conn: Optional[Connection] = None
+    ) -> Optional[Mapping[str, Any]]:
         """获取利润表数据
-        
+
         Args:
             stock_code: 股票代码，如 "000001"
             report_period: 报告期，如 "2024-03-31"
             report_type: 报表类型，A=合并报表，B=母公司报表
-            
+            conn: 可选的已打开连接（批量场景下复用，省去连接检出）
+
         Returns:
             利润表数据字典，如果不存在返回None
         """
         try:
-            query = text("""
-                SELECT 
-                    stkcd,
-                    accper,
-                    typrep,
-                    short_name,
-                    -- 营业收入
-                    b001101000 as revenue,
-                    -- 营业成本
-                    b001201000 as cost,
-                    -- 税金及附加
-                    b001207000 as business_tax,
-                    -- 销售费用
-                    b001209000 as sales_expense,
-                    -- 管理费用
-                    b001210000 as admin_expense,
-                    -- 研发费用
-                    b001216000 as rd_expense,
-                    -- 财务费用
-                    b001211000 as finance_expense,
-                    -- 营业利润
-                    b001300000 as operating_profit,
-                    -- 利润总额
-                    b001000000 as total_profit,
-                    -- 净利润
-                    b002000000 as net_profit,
-                    -- 归属于母公司所有者的净利润
-                    b002000101 as net_profit_parent
-                FROM ashare.a_share_income_statement
-                WHERE stkcd = :stock_code
-                    AND accper = :report_period
-                    AND typrep = :report_type
-                LIMIT 1
-            """)
-            
-            with self.engine.connect() as conn:
-                result = conn.execute(
-                    query,
+            with self._connection(conn) as c:
+                result = c.execute(
+                    _INCOME_SQL,
                     {
                         "stock_code": stock_code,
                         "report_period": report_period,
                         "report_type": report_type
                     }
                 ).fetchone()
-                
+
                 if result:
-                    # 转换为字典
-                    data = dict(result._mapping)
+                    # RowMapping是C层的只读映射视图，按键取值与dict
+                    # 一致，省去每行一次的字典物化拷贝
+                    data = result._mapping
                     logger.info(f"✅ 获取利润表数据: {stock_code} {report_period}")
                     return data
                 else:
                     logger.warning(f"⚠️ 未找到利润表数据: {stock_code} {report_period}")
                     return None
-                    
+
         except Exception as e:
             logger.error(f"❌ 获取利润表数据失败: {e}")
             return None
-    
+
     def get_balance_sheet(
         self,
         stock_code: str,
         report_period: str,
-        report_type: str = "A"
-    ) -> Optional[Dict[str, Any]]:
+        report_type: str = "A",
+        conn: Optional[Connection] = None
+    ) -> Optional[Mapping[str, Any]]:
         """获取资产负债表数据
-        
+
         Args:
             stock_code: 股票代码
             report_period: 报告期
             report_type: 报表类型
-            
+            conn: 可选的已打开连接
+
         Returns:
             资产负债表数据字典
         """
         try:
-            query = text("""
-                SELECT 
-                    stkcd,
-                    accper,
-                    typrep,
-                    short_name,
-                    -- 资产
-                    a001100000 as current_assets,
-                    a001200000 as non_current_assets,
-                    a001000000 as total_assets,
-                    -- 负债
-                    a002100000 as current_liabilities,
-                    a002200000 as non_current_liabilities,
-                    a002000000 as total_liabilities,
-                    -- 股东权益
-                    a003000000 as total_equity,
-                    a003100000 as parent_equity,
-                    -- 特殊项目
-                    a001123000 as inventory,  -- 存货
-                    a002128000 as contract_liability  -- 合同负债
-                FROM ashare.a_share_balance_sheet
-                WHERE stkcd = :stock_code
-                    AND accper = :report_period
-                    AND typrep = :report_type
-                LIMIT 1
-            """)
-            
-            with self.engine.connect() as conn:
-                result = conn.execute(
-                    query,
+            with self._connection(conn) as c:
+                result = c.execute(
+                    _BALANCE_SQL,
                     {
                         "stock_code": stock_code,
                         "report_period": report_period,
                         "report_type": report_type
                     }
                 ).fetchone()
-                
+
                 if result:
-                    data = dict(result._mapping)
+                    data = result._mapping
                     logger.info(f"✅ 获取资产负债表数据: {stock_code} {report_period}")
                     return data
                 else:
                     logger.warning(f"⚠️ 未找到资产负债表数据: {stock_code} {report_period}")
                     return None
-                    
+
         except Exception as e:
             logger.error(f"❌ 获取资产负债表数据失败: {e}")
             return None
-    
+
     def get_cash_flow(
         self,
         stock_code: str,
         report_period: str,
-        report_type: str = "A"
-    ) -> Optional[Dict[str, Any]]:
+        report_type: str = "A",
+        conn: Optional[Connection] = None
+    ) -> Optional[Mapping[str, Any]]:
         """获取现金流量表数据
-        
+
         Args:
             stock_code: 股票代码
             report_period: 报告期
             report_type: 报表类型
-            
+            conn: 可选的已打开连接
+
         Returns:
             现金流量表数据字典
         """
         try:
-            query = text("""
-                SELECT 
-                    stkcd,
-                    accper,
-                    typrep,
-                    short_name,
-                    -- 经营活动现金流
-                    c001100000 as operating_cash_inflow,
-                    c001200000 as operating_cash_outflow,
-                    c001000000 as net_operating_cash_flow,
-                    -- 投资活动现金流
-                    c002100000 as investing_cash_inflow,
-                    c002200000 as investing_cash_outflow,
-                    c002000000 as net_investing_cash_flow,
-                    -- 筹资活动现金流
-                    c003100000 as financing_cash_inflow,
-                    c003200000 as financing_cash_outflow,
-                    c003000000 as net_financing_cash_flow,
-                    -- 现金净增加额
-                    c005000000 as net_cash_increase
-                FROM ashare.a_share_cashflow_statement
-                WHERE stkcd = :stock_code
-                    AND accper = :report_period
-                    AND typrep = :report_type
-                LIMIT 1
-            """)
-            
-            with self.engine.connect() as conn:
-                result = conn.execute(
-                    query,
+            with self._connection(conn) as c:
+                result = c.execute(
+                    _CASHFLOW_SQL,
                     {
                         "stock_code": stock_code,
                         "report_period": report_period,
                         "report_type": report_type
                     }
                 ).fetchone()
-                
+
                 if result:
-                    data = dict(result._mapping)
+                    data = result._mapping
                     logger.info(f"✅ 获取现金流量表数据: {stock_code} {report_period}")
                     return data
                 else:
                     logger.warning(f"⚠️ 未找到现金流量表数据: {stock_code} {report_period}")
                     return None
-                    
+
         except Exception as e:
             logger.error(f"❌ 获取现金流量表数据失败: {e}")
             return None
-    
+
+    def get_columns(
+        self,
+        stock_code: str,
+        report_period: str,
+        columns: FrozenSet[str],
+        report_type: str = "A",
+        conn: Optional[Connection] = None
+    ) -> Dict[str, Any]:
+        """按列投影获取指定报表科目的取值
+
+        配合IndustryConfig.required_db_fields使用：行业配置声明
+        需要哪些科目编码，这里只SELECT这些列，不取整行。
+        带"_prev"后缀的字段归一化为基础列名后查询（上期值由
+        调用方以上期报告期再查一次）。
+
+        Args:
+            stock_code: 股票代码
+            report_period: 报告期
+            columns: 科目编码集合（如行业配置的required_db_fields）
+            report_type: 报表类型
+            conn: 可选的已打开连接
+
+        Returns:
+            {科目编码: 取值}，未命中的表/列不出现在结果中
+
+        Raises:
+            ValueError: 列名不在白名单模式内
+        """
+        # 归一化并按报表分桶；列名逐一过白名单校验后才拼入SQL
+        by_table: Dict[str, List[str]] = {}
+        for col in columns:
+            base = col[:-5] if col.endswith("_prev") else col
+            if not _PROJECTION_COLUMN_RE.match(base):
+                raise ValueError(f"非法的报表科目编码: {col}")
+            by_table.setdefault(_PROJECTION_TABLES[base[0]], []).append(base)
+
+        values: Dict[str, Any] = {}
+        try:
+            with self._connection(conn) as c:
+                for table, cols in by_table.items():
+                    # 排序保证同一列集合生成相同语句，命中编译缓存
+                    query = text(
+                        f"SELECT {', '.join(sorted(set(cols)))} FROM {table}"
+                        + _SINGLE_PERIOD_WHERE
+                    )
+                    result = c.execute(
+                        query,
+                        {
+                            "stock_code": stock_code,
+                            "report_period": report_period,
+                            "report_type": report_type
+                        }
+                    ).fetchone()
+                    if result:
+                        values.update(result._mapping)
+        except Exception as e:
+            logger.error(f"❌ 按列获取财务数据失败: {e}")
+            return values
+
+        logger.info(f"✅ 按列获取财务数据: {stock_code} {report_period} ({len(values)}列)")
+        return values
+
     def get_historical_periods(
         self,
         stock_code: str,
         current_period: str,
-        count: int = 4
+        count: int = 4,
+        conn: Optional[Connection] = None
     ) -> List[str]:
         """获取历史报告期列表
-        
+
         Args:
             stock_code: 股票代码
             current_period: 当前报告期
             count: 获取历史期数
-            
+            conn: 可选的已打开连接
+
         Returns:
             历史报告期列表（降序）
         """
+        cache_key = ("historical-periods", stock_code, current_period, count)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            query = text("""
-                SELECT DISTINCT accper
-                FROM ashare.a_share_income_statement
-                WHERE stkcd = :stock_code
-                    AND accper < :current_period
-                ORDER BY accper DESC
-                LIMIT :count
-            """)
-            
-            with self.engine.connect() as conn:
-                results = conn.execute(
-                    query,
+            with self._connection(conn) as c:
+                results = c.execute(
+                    _HIST_SQL,
                     {
                         "stock_code": stock_code,
                         "current_period": current_period,
                         "count": count
                     }
                 ).fetchall()
-                
+
                 periods = [str(row[0]) for row in results]
                 logger.info(f"✅ 获取历史期数: {len(periods)}期")
+                if periods:
+                    self._cache_put(cache_key, periods)
                 return periods
-                
+
         except Exception as e:
             logger.error(f"❌ 获取历史期数失败: {e}")
             return []
-    
+
+    def _fetch_two_periods(
+        self,
+        conn: Connection,
+        query,
+        stock_code: str,
+        current_period: str,
+        previous_period: str,
+        report_type: str
+    ) -> Dict[str, Mapping[str, Any]]:
+        """一次查询取回当期与上期的报表行，按报告期索引
+
+        Returns:
+            {报告期字符串: 行数据字典}
+        """
+        rows = conn.execute(
+            query,
+            {
+                "stock_code": stock_code,
+                "current_period": current_period,
+                "previous_period": previous_period,
+                "report_type": report_type
+            }
+        ).fetchall()
+        return {str(row._mapping["accper"]): row._mapping for row in rows}
+
     def get_complete_financial_data(
         self,
         stock_code: str,
@@ -295,16 +504,26 @@ class FinancialDataService:
         include_previous: bool = True
     ) -> Dict[str, Any]:
         """获取完整的财务数据（三张表）
-        
+
+        全程复用一个连接：先查上期报告期，再对每张表发一条
+        当期+上期的合并查询。相比逐表逐期各开一个连接（最多6次
+        检出+6次往返），降为1次检出+4次往返。
+
         Args:
             stock_code: 股票代码
             report_period: 报告期
             report_type: 报表类型
             include_previous: 是否包含上期数据
-            
+
         Returns:
             包含三张表的完整数据
         """
+        cache_key = ("complete-data", stock_code, report_period,
+                     report_type, include_previous)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         result = {
             "stock_code": stock_code,
             "report_period": report_period,
@@ -315,42 +534,108 @@ class FinancialDataService:
             "previous_period": None,
             "previous_data": None
         }
-        
-        # 获取当期数据
-        result["income_statement"] = self.get_income_statement(
-            stock_code, report_period, report_type
-        )
-        result["balance_sheet"] = self.get_balance_sheet(
-            stock_code, report_period, report_type
-        )
-        result["cash_flow"] = self.get_cash_flow(
-            stock_code, report_period, report_type
-        )
-        
-        # 获取上期数据
-        if include_previous:
-            historical = self.get_historical_periods(stock_code, report_period, count=1)
-            if historical:
-                previous_period = historical[0]
-                result["previous_period"] = previous_period
-                result["previous_data"] = {
-                    "income_statement": self.get_income_statement(
-                        stock_code, previous_period, report_type
-                    ),
-                    "balance_sheet": self.get_balance_sheet(
-                        stock_code, previous_period, report_type
-                    ),
-                    "cash_flow": self.get_cash_flow(
-                        stock_code, previous_period, report_type
+
+        try:
+            with self.engine.connect() as conn:
+                previous_period = None
+                if include_previous:
+                    historical = self.get_historical_periods(
+                        stock_code, report_period, count=1, conn=conn
                     )
+                    if historical:
+                        previous_period = historical[0]
+
+                # 上期缺失时双期参数退化为当期，查询仍然正确
+                lookup_previous = previous_period or report_period
+                tables = {
+                    "income_statement": _INCOME_TWO_PERIOD_SQL,
+                    "balance_sheet": _BALANCE_TWO_PERIOD_SQL,
+                    "cash_flow": _CASHFLOW_TWO_PERIOD_SQL,
                 }
-        
+                previous_data = {}
+                for key, query in tables.items():
+                    by_period = self._fetch_two_periods(
+                        conn, query, stock_code,
+                        report_period, lookup_previous, report_type
+                    )
+                    result[key] = by_period.get(report_period)
+                    previous_data[key] = (
+                        by_period.get(previous_period) if previous_period else None
+                    )
+
+                if previous_period:
+                    result["previous_period"] = previous_period
+                    result["previous_data"] = previous_data
+        except Exception as e:
+            logger.error(f"❌ 获取完整财务数据失败: {e}")
+            return result
+
+        # 仅缓存查到数据的结果，避免把导入前的空结果钉住1小时
+        if result["income_statement"] or result["balance_sheet"] or result["cash_flow"]:
+            self._cache_put(cache_key, result)
         logger.success(f"✅ 获取完整财务数据: {stock_code} {report_period}")
         return result
-    
+
+    def get_complete_financial_data_batch(
+        self,
+        requests: List[Tuple[str, str]],
+        report_type: str = "A"
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """批量获取多个股票/报告期的三张表数据
+
+        无论请求多少组(股票, 报告期)，总共只发3条查询（每张表
+        一条IN列表查询），替代逐股票循环调用
+        get_complete_financial_data时的N×3次往返。
+
+        Args:
+            requests: (股票代码, 报告期)元组列表
+            report_type: 报表类型（整批共用）
+
+        Returns:
+            {(股票代码, 报告期): 三张表数据字典}，缺失的表为None
+        """
+        results: Dict[Tuple[str, str], Dict[str, Any]] = {
+            (stock_code, period): {
+                "stock_code": stock_code,
+                "report_period": period,
+                "report_type": report_type,
+                "income_statement": None,
+                "balance_sheet": None,
+                "cash_flow": None,
+            }
+            for stock_code, period in requests
+        }
+        if not results:
+            return results
+
+        keys = list(results.keys())
+        tables = (
+            ("income_statement", _INCOME_BATCH_SQL),
+            ("balance_sheet", _BALANCE_BATCH_SQL),
+            ("cash_flow", _CASHFLOW_BATCH_SQL),
+        )
+        try:
+            with self.engine.connect() as conn:
+                for field, query in tables:
+                    rows = conn.execute(
+                        query,
+                        {"keys": keys, "report_type": report_type}
+                    ).fetchall()
+                    for row in rows:
+                        mapping = row._mapping
+                        key = (mapping["stkcd"], str(mapping["accper"]))
+                        if key in results:
+                            results[key][field] = mapping
+        except Exception as e:
+            logger.error(f"❌ 批量获取财务数据失败: {e}")
+            return results
+
+        logger.success(f"✅ 批量获取完整财务数据: {len(keys)}组")
+        return results
+
     def close(self):
         """关闭数据库连接"""
+        self.clear_cache()
         if self.engine:
             self.engine.dispose()
             logger.info("数据库连接已关闭")
-
@@ -2,49 +2,80 @@
 from abc import ABC, abstractmethod
 from typing import List, Union
 
+import numpy as np
+
 
 class BaseEmbeddingService(ABC):
     """Embedding服务抽象基类
-    
+
     定义统一的embedding生成接口，支持不同的实现方式：
     - 本地模型（SentenceTransformer）
     - HTTP服务（远程embedding服务）
+
+    吞吐量依赖批量推理（一次前向/一次请求打包N条文本），
+    因此实现方只需提供encode_batch；encode是兼容入口，
+    单条文本也统一走批量路径，避免下游退化为逐条调用
     """
-    
+
     @abstractmethod
+    def encode_batch(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """批量生成文本的embedding向量
+
+        Args:
+            texts: 文本列表
+            batch_size: 批处理大小
+            show_progress_bar: 是否显示进度条
+
+        Returns:
+            形状为(N, dim)的连续float32 ndarray
+        """
+        pass
+
     def encode(
-        self, 
-        texts: Union[str, List[str]], 
+        self,
+        texts: Union[str, List[str]],
         batch_size: int = 32,
         show_progress_bar: bool = False
-    ) -> List[List[float]]:
-        """生成文本的embedding向量
-        
+    ) -> np.ndarray:
+        """生成文本的embedding向量（兼容入口，内部走encode_batch）
+
         Args:
             texts: 单个文本或文本列表
             batch_size: 批处理大小
             show_progress_bar: 是否显示进度条
-            
+
         Returns:
-            embedding向量列表，每个向量是float列表
+            形状为(N, dim)的float32 ndarray。相比List[List[float]]
+            省去数万个Python float装箱（1024维×32条约900KB对128KB），
+            Milvus插入也原生接受ndarray
         """
-        pass
-    
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.encode_batch(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress_bar
+        )
+
     @abstractmethod
     def get_dimension(self) -> int:
         """获取embedding维度
-        
+
         Returns:
             向量维度
         """
         pass
-    
+
     @abstractmethod
     def get_model_name(self) -> str:
         """获取模型名称
-        
+
         Returns:
             模型名称或服务地址
         """
         pass
-
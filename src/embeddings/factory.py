@@ -1,4 +1,6 @@
 """Embedding服务工厂"""
+from typing import Optional
+
 from loguru import logger
 
 from src.embeddings.base_embedding import BaseEmbeddingService
@@ -13,32 +15,46 @@ class EmbeddingFactory:
     根据配置自动创建合适的embedding服务实例
     """
     
-    @staticmethod
-    def create_embedding_service() -> BaseEmbeddingService:
-        """创建embedding服务实例
-        
+    # 进程级单例：本地模式加载BGE模型需数秒和1GB+显存，
+    # HTTP模式重复建连接池同样浪费，构造一次全局复用
+    _instance: Optional[BaseEmbeddingService] = None
+
+    @classmethod
+    def create_embedding_service(cls) -> BaseEmbeddingService:
+        """创建embedding服务实例（进程级单例）
+
         根据配置中的EMBEDDING_SERVICE_TYPE选择：
         - 'local': 使用本地SentenceTransformer模型
         - 'http': 通过HTTP接口调用远程服务
-        
+
         Returns:
             Embedding服务实例
         """
+        if cls._instance is not None:
+            return cls._instance
+
         service_type = settings.EMBEDDING_SERVICE_TYPE.lower()
-        
+
         if service_type == "local":
             logger.info("📊 使用本地Embedding模型服务")
-            return LocalEmbeddingService()
-        
+            cls._instance = LocalEmbeddingService()
+
         elif service_type == "http":
             logger.info("🌐 使用HTTP Embedding服务")
-            return HttpEmbeddingService()
-        
+            cls._instance = HttpEmbeddingService()
+
         else:
             raise ValueError(
                 f"不支持的Embedding服务类型: {service_type}. "
                 f"请设置EMBEDDING_SERVICE_TYPE为 'local' 或 'http'"
             )
+
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """丢弃缓存的单例（测试或切换服务类型时使用）"""
+        cls._instance = None
     
     @staticmethod
     def get_service_info(service: BaseEmbeddingService) -> dict:
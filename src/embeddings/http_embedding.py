@@ -1,6 +1,9 @@
 """HTTP Embedding服务客户端"""
 import requests
-from typing import List, Union
+from requests.adapters import HTTPAdapter, Retry
+from typing import List
+
+import numpy as np
 from loguru import logger
 
 from src.embeddings.base_embedding import BaseEmbeddingService
@@ -19,17 +22,30 @@ class HttpEmbeddingService(BaseEmbeddingService):
         self.model_name = settings.EMBEDDING_MODEL
         self.dimension = settings.EMBEDDING_DIM
         self.timeout = settings.EMBEDDING_API_TIMEOUT
-        
-        # 验证服务连接
+
+        # Session + 连接池复用TCP连接（Keep-Alive），
+        # 每批embedding请求免去重新握手；瞬时网络错误自动重试
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.2,
+                              status_forcelist=(502, 503, 504)),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 验证服务连接（同时预热Keep-Alive连接，
+        # 首个真实批次不再承担建连开销）
         self._validate_connection()
-    
+
     def _validate_connection(self):
         """验证embedding服务连接"""
         try:
             logger.info(f"正在连接Embedding服务: {self.base_url}")
-            
+
             # 发送健康检查请求
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/health",
                 timeout=5
             )
@@ -43,30 +59,25 @@ class HttpEmbeddingService(BaseEmbeddingService):
             logger.error(f"❌ 无法连接到Embedding服务: {e}")
             raise ConnectionError(f"Embedding服务连接失败: {self.base_url}")
     
-    def encode(
-        self, 
-        texts: Union[str, List[str]], 
+    def encode_batch(
+        self,
+        texts: List[str],
         batch_size: int = 32,
         show_progress_bar: bool = False
-    ) -> List[List[float]]:
-        """通过HTTP接口生成embedding向量
-        
+    ) -> np.ndarray:
+        """通过HTTP接口批量生成embedding向量
+
+        全部文本打进一次POST请求，批次切分由服务端负责
+
         Args:
-            texts: 单个文本或文本列表
+            texts: 文本列表
             batch_size: 批处理大小（HTTP服务端控制）
             show_progress_bar: 是否显示进度条（暂不支持）
-            
+
         Returns:
-            embedding向量列表
+            形状为(N, dim)的float32 ndarray
         """
         try:
-            # 确保texts是列表
-            if isinstance(texts, str):
-                texts = [texts]
-                is_single = True
-            else:
-                is_single = False
-            
             # 准备请求数据
             payload = {
                 "texts": texts,
@@ -74,8 +85,8 @@ class HttpEmbeddingService(BaseEmbeddingService):
                 "batch_size": batch_size
             }
             
-            # 发送POST请求
-            response = requests.post(
+            # 发送POST请求（走Session连接池）
+            response = self.session.post(
                 f"{self.base_url}/embeddings",
                 json=payload,
                 timeout=self.timeout
@@ -102,9 +113,9 @@ class HttpEmbeddingService(BaseEmbeddingService):
                 )
             
             logger.debug(f"✅ 通过HTTP获取了 {len(embeddings)} 个embedding向量")
-            
-            return embeddings
-            
+
+            return np.asarray(embeddings, dtype=np.float32)
+
         except requests.exceptions.Timeout:
             logger.error(f"❌ Embedding服务请求超时 (timeout={self.timeout}s)")
             raise
@@ -118,8 +129,12 @@ class HttpEmbeddingService(BaseEmbeddingService):
     def get_dimension(self) -> int:
         """获取embedding维度"""
         return self.dimension
-    
+
     def get_model_name(self) -> str:
         """获取模型名称"""
         return f"{self.base_url} ({self.model_name})"
 
+    def close(self):
+        """关闭HTTP会话，释放连接池"""
+        self.session.close()
+
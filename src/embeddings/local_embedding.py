@@ -1,7 +1,9 @@
 """本地Embedding模型服务"""
 import os
-from typing import List, Union
+from typing import List
 from pathlib import Path
+
+import numpy as np
 from loguru import logger
 from sentence_transformers import SentenceTransformer
 import torch
@@ -64,38 +66,34 @@ class LocalEmbeddingService(BaseEmbeddingService):
             logger.error(f"❌ 加载本地Embedding模型失败: {e}")
             raise
     
-    def encode(
-        self, 
-        texts: Union[str, List[str]], 
+    def encode_batch(
+        self,
+        texts: List[str],
         batch_size: int = 32,
         show_progress_bar: bool = False
-    ) -> List[List[float]]:
-        """生成文本的embedding向量
-        
+    ) -> np.ndarray:
+        """批量生成文本的embedding向量
+
+        整批文本交给一次model.encode调用（内部按batch_size做
+        cuBLAS批量GEMM），不在Python层逐条推理
+
         Args:
-            texts: 单个文本或文本列表
+            texts: 文本列表
             batch_size: 批处理大小
             show_progress_bar: 是否显示进度条
-            
+
         Returns:
-            embedding向量列表
+            形状为(N, dim)的float32 ndarray
         """
         try:
-            # 确保texts是列表
-            if isinstance(texts, str):
-                texts = [texts]
-            
-            # 使用模型生成embeddings
             embeddings = self.model.encode(
                 texts,
                 batch_size=batch_size,
                 show_progress_bar=show_progress_bar,
                 convert_to_numpy=True
             )
-            
-            # 转换为列表格式
-            return embeddings.tolist()
-            
+            return embeddings.astype(np.float32, copy=False)
+
         except Exception as e:
             logger.error(f"❌ 生成embedding失败: {e}")
             raise
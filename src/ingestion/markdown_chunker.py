@@ -1,10 +1,12 @@
-import json
+import os
 import re
 import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import orjson
+
 
 @dataclass
 class HeadingInfo:
@@ -33,6 +35,11 @@ class MarkdownChunker:
 
     TABLE_PATTERN = re.compile(r"<table[\s\S]*?</table>", re.IGNORECASE)
     SENTENCE_PATTERN = re.compile(r".+?(?:[。！？!?；;．.](?!\d)|$)")
+    # 逐行扫描的热路径正则：预编译为类属性，省去每行一次的
+    # re模块缓存查找（大文档有数万行）
+    HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+    BULLET_PATTERN = re.compile(r"^(\*|-|\+)\s+")
+    ORDERED_PATTERN = re.compile(r"^\d+\.\s+")
 
     def __init__(self, max_chunk_chars: int = 600, min_chunk_chars: int = 200):
         self.max_chunk_chars = max_chunk_chars
@@ -185,7 +192,7 @@ class MarkdownChunker:
                     buffer, buffer_type = [], None
                 continue
 
-            heading_match = re.match(r"^(#{1,6})\s+(.*)$", stripped)
+            heading_match = self.HEADING_PATTERN.match(stripped)
             if heading_match:
                 if buffer:
                     blocks.append(Block(buffer_type or "paragraph", "\n".join(buffer)))
@@ -202,7 +209,7 @@ class MarkdownChunker:
                 blocks.append(Block("table", stripped))
                 continue
 
-            if re.match(r"^(\*|-|\+)\s+", stripped) or re.match(r"^\d+\.\s+", stripped):
+            if self.BULLET_PATTERN.match(stripped) or self.ORDERED_PATTERN.match(stripped):
                 if buffer_type not in (None, "list"):
                     blocks.append(Block(buffer_type, "\n".join(buffer)))
                     buffer = []
@@ -286,24 +293,26 @@ class MarkdownChunker:
         joined = "\n\n".join(part.strip("\n") for part in parts if part.strip())
         return joined.strip()
 
+    # 分类关键词表：模块加载时构建一次，不在每个chunk上重建
+    CLASSIFY_RULES = {
+        "management_discussion": ("管理层讨论", "经营情况", "分析", "讨论与分析"),
+        "financial_analysis": ("财务状况", "利润", "成本", "费用", "毛利", "收入", "财务"),
+        "cashflow": ("现金流", "经营活动产生", "投资活动", "筹资活动"),
+        "risk": ("风险", "重大事项", "诉讼", "承诺", "不确定性"),
+        "governance": ("治理", "董事会", "监事会", "内控", "审计"),
+        "business_overview": ("主营业务", "行业情况", "产品", "市场", "区域"),
+        "summary": ("重要提示", "摘要"),
+        "notes": ("附注", "补充资料"),
+    }
+
     def _classify_chunk(self, text: str, title_path: List[str]) -> str:
         lowered = text.lower()
         if "<table" in lowered and "</table>" in lowered:
             return "table"
 
         corpus = " ".join(title_path) + " " + text
-        rules = {
-            "management_discussion": ["管理层讨论", "经营情况", "分析", "讨论与分析"],
-            "financial_analysis": ["财务状况", "利润", "成本", "费用", "毛利", "收入", "财务"],
-            "cashflow": ["现金流", "经营活动产生", "投资活动", "筹资活动"],
-            "risk": ["风险", "重大事项", "诉讼", "承诺", "不确定性"],
-            "governance": ["治理", "董事会", "监事会", "内控", "审计"],
-            "business_overview": ["主营业务", "行业情况", "产品", "市场", "区域"],
-            "summary": ["重要提示", "摘要"],
-            "notes": ["附注", "补充资料"],
-        }
-
-        for label, keywords in rules.items():
+
+        for label, keywords in self.CLASSIFY_RULES.items():
             if any(keyword in corpus for keyword in keywords):
                 return label
 
@@ -311,8 +320,12 @@ class MarkdownChunker:
 
 
 def save_chunks_to_file(chunks: List[Dict], output_path: str):
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as fp:
-        json.dump(chunks, fp, ensure_ascii=False, indent=2)
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # orjson直接产出UTF-8字节，大chunk列表比stdlib json快一个数量级；
+    # 先写临时文件再原子替换，中途失败不会留下半写的输出
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(orjson.dumps(chunks, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, path)
 
 
@@ -4,6 +4,8 @@ import hashlib
 from pathlib import Path
 from typing import List, Dict, Optional
 
+import numpy as np
+
 from loguru import logger
 
 from src.embeddings.factory import EmbeddingFactory
@@ -303,10 +305,10 @@ class ReportIngestionService:
     # ----------------------------
     # Embedding wrapper
     # ----------------------------
-    def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         生成 embedding（调用外部 embedding service）
-        支持批量输入，返回 list of vectors
+        支持批量输入，返回 (N, dim) float32 ndarray
         """
         # 过滤空文本以避免 embedding 服务报错
         sanitized = [t if t is not None else "" for t in texts]
@@ -317,7 +319,7 @@ class ReportIngestionService:
                 batch_size=getattr(settings, "EMBEDDING_BATCH_SIZE", 32),
                 show_progress_bar=True
             )
-            if not embeddings or len(embeddings) != len(sanitized):
+            if len(embeddings) != len(sanitized):
                 logger.warning("embedding 数量与输入不一致，检查 embedding 服务")
             return embeddings
         except Exception as e:
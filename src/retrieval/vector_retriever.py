@@ -1,5 +1,7 @@
 """向量检索器 - 从Milvus检索相关财报信息"""
 from typing import List, Dict, Optional
+
+import numpy as np
 from loguru import logger
 from pymilvus import connections, Collection
 
@@ -48,8 +50,8 @@ class VectorRetriever:
             logger.error(f"❌ Embedding服务初始化失败: {e}")
             raise
     
-    def _generate_embedding(self, text: str) -> List[float]:
-        """生成文本embedding"""
+    def _generate_embedding(self, text: str) -> np.ndarray:
+        """生成文本embedding（1维float32向量，Milvus检索原生接受）"""
         embeddings = self.embedding_service.encode(text)
         return embeddings[0]
     